@@ -21,21 +21,25 @@ Check utility requirements
 import os
 import sys
 import logging
+from functools import lru_cache
 import lib.cmd_utils as cmd_utils
 import pkg_resources
 
 logger = logging.getLogger('main')
 
 
+@lru_cache(maxsize=1)
 def get_processing_chain_dir():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
 
+@lru_cache(maxsize=1)
 def get_processing_chain_version():
+    # spawns git, so only do this once per run; it is written to every logfile
     processing_chain_dir = get_processing_chain_dir()
     git_version, _ = cmd_utils.run_command('cd "' + processing_chain_dir + '" && git describe --always')
-    with open(os.path.join(get_processing_chain_dir(), 'VERSION'), 'r') as version_f:
-        major_version = version_f.readlines()[0].strip()
+    with open(os.path.join(processing_chain_dir, 'VERSION'), 'r') as version_f:
+        major_version = version_f.readline().strip()
     version = git_version.strip() + " v" + major_version
     return version
 
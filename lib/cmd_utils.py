@@ -18,10 +18,11 @@
 Command-line helper utils
 """
 
+import asyncio
 import subprocess
 import logging
+import re
 import sys
-from multiprocessing import Pool
 from subprocess import SubprocessError
 
 logger = logging.getLogger('main')
@@ -45,6 +46,19 @@ def shell_call(cmd, raw=True):
         sys.exit(1)
 
 
+def compile_path_stripper(prefixes):
+    """
+    Return a compiled pattern matching any of the given path prefixes,
+    to remove absolute paths from commands in a single pass with .sub("", cmd).
+
+    Arguments:
+        - prefixes: list of path prefixes, including their trailing slash
+    """
+    # longest first, so that a prefix never shadows a longer one it is part of
+    prefixes = sorted(prefixes, key=len, reverse=True)
+    return re.compile("|".join(re.escape(p) for p in prefixes))
+
+
 class ParallelRunner():
     """
     Class for running commands in parallel and getting output
@@ -66,22 +80,31 @@ class ParallelRunner():
         if cmd:
             self.cmds.add((cmd, name))
 
-    def _run_single_cmd(self, cmd, name):
-        logger.info("starting command: {}".format(name))
-        logger.debug("starting command: {}".format(cmd))
-        ret, stdout, stderr = shell_call(cmd)
-        if ret != 0:
-            logger.error("Error running parallel command: {cmd} \n{stdout}\n{stderr}".format(cmd=cmd, stdout=stdout, stderr=stderr))
-        return ret == 0
-        self.outputs[cmd] = {
-            "stdout": stdout,
-            "stderr": stderr
-        }
+    async def _run_single_cmd(self, cmd, name, semaphore):
+        async with semaphore:
+            logger.info("starting command: {}".format(name))
+            logger.debug("starting command: {}".format(cmd))
+            process = await asyncio.create_subprocess_shell(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            logger.error("Error running parallel command: {cmd} \n{stdout}\n{stderr}".format(cmd=cmd, stdout=str(stdout, "utf-8"), stderr=str(stderr, "utf-8")))
+        return process.returncode == 0
+
+    async def _run_all_cmds(self):
+        # at most max_parallel commands run at the same time
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        return await asyncio.gather(*[self._run_single_cmd(cmd, name, semaphore) for cmd, name in self.cmds])
 
     def run_commands(self):
         logger.debug("starting parallel run of commands")
-        pool = Pool(processes=self.max_parallel)
-        results = pool.starmap(self._run_single_cmd, self.cmds)
+        # a fresh event loop per run, asyncio.run() is not available before Python 3.7
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            results = loop.run_until_complete(self._run_all_cmds())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
         if not all(results):
             logger.error("There were errors in your commands. Please check the output and re-run the processing chain!")
             sys.exit(1)
@@ -21,6 +21,7 @@ FFmpeg helpers
 import os
 import sys
 import json
+import shlex
 from fractions import Fraction
 from collections import OrderedDict
 import lib.cmd_utils as cmd_utils
@@ -110,7 +111,7 @@ def _get_video_encoder_command_crf(segment, logfile=""):
         {iframe_interval_cmd}
         {x264_params_cmd}
         -pix_fmt {pix_fmt}
-        """.format(**locals())
+        """.format(rate_control_cmd=rate_control_cmd, iframe_interval_cmd=iframe_interval_cmd, x264_params_cmd=x264_params_cmd, pix_fmt=pix_fmt)
 
     elif encoder == "libx265":
 
@@ -151,7 +152,7 @@ def _get_video_encoder_command_crf(segment, logfile=""):
         {x265_params_cmd}
         {minrate_cmd}
         -pix_fmt {pix_fmt}
-        """.format(**locals())
+        """.format(rate_control_cmd=rate_control_cmd, x265_params_cmd=x265_params_cmd, minrate_cmd=minrate_cmd, pix_fmt=pix_fmt)
 
     elif encoder == "libvpx-vp9":
         # construct rate control commands
@@ -177,7 +178,7 @@ def _get_video_encoder_command_crf(segment, logfile=""):
         {iframe_interval_cmd}
         -strict -2
         -pix_fmt {pix_fmt}
-        """.format(**locals())
+        """.format(rate_control_cmd=rate_control_cmd, iframe_interval_cmd=iframe_interval_cmd, pix_fmt=pix_fmt)
 
     else:
         logger.error("wrong encoder: " + str(encoder))
@@ -283,7 +284,9 @@ def _get_video_encoder_command(segment, current_pass=1, total_passes=1, logfile=
         {preset_cmd}
         -pix_fmt {pix_fmt}
         {pass_cmd} {passlogfile_cmd}
-        """.format(**locals())
+        """.format(
+            rate_control_cmd=rate_control_cmd, iframe_interval_cmd=iframe_interval_cmd, x264_params_cmd=x264_params_cmd,
+            preset_cmd=preset_cmd, pix_fmt=pix_fmt, pass_cmd=pass_cmd, passlogfile_cmd=passlogfile_cmd)
 
     elif encoder == "libx265":
         # construct rate control commands
@@ -328,7 +331,7 @@ def _get_video_encoder_command(segment, current_pass=1, total_passes=1, logfile=
         {x265_params_cmd}
         {preset_cmd}
         -pix_fmt {pix_fmt}
-        """.format(**locals())
+        """.format(bitrate=bitrate, minrate_cmd=minrate_cmd, x265_params_cmd=x265_params_cmd, preset_cmd=preset_cmd, pix_fmt=pix_fmt)
 
     elif encoder == "libvpx-vp9":
         # construct rate control commands
@@ -354,7 +357,9 @@ def _get_video_encoder_command(segment, current_pass=1, total_passes=1, logfile=
         -speed {speed}
         -pix_fmt {pix_fmt}
         {pass_cmd} {passlogfile_cmd}
-        """.format(**locals())
+        """.format(
+            rate_control_cmd=rate_control_cmd, iframe_interval_cmd=iframe_interval_cmd, quality=quality, speed=speed,
+            pix_fmt=pix_fmt, pass_cmd=pass_cmd, passlogfile_cmd=passlogfile_cmd)
 
     else:
         logger.error("wrong encoder: " + str(encoder))
@@ -455,7 +460,7 @@ def get_stream_size(segment, stream_type="video"):
             size = ydata['get_stream_size'][switch]
     else:
         stdout, _ = cmd_utils.run_command(cmd, name="get accumulated frame size for " + str(segment))
-        size = sum([int(ll) for ll in stdout.split("\n") if ll != ""])
+        size = sum(int(ll) for ll in stdout.split("\n") if ll != "")
 
     return size
 
@@ -495,12 +500,7 @@ def get_segment_info(segment):
     """
     input_file = segment.file_path
 
-    if sys.platform == "darwin":
-        cmd = "stat -f '%z' '" + input_file + "'"
-    else:
-        cmd = "stat -c '%s' '" + input_file + "'"
-    stdout, _ = cmd_utils.run_command(cmd, name="get segment size for " + str(segment))
-    segment_size = int(stdout.strip())
+    segment_size = os.path.getsize(input_file)
 
     cmd = "ffprobe -loglevel error -show_streams -of json '" + input_file + "'"
     stdout, _ = cmd_utils.run_command(cmd, name="get segment video info for " + str(segment))
@@ -666,6 +666,30 @@ def get_src_info(src):
     return returndata
 
 
+def get_src_info_and_stream_sizes(input_file):
+    """
+    Get the same data as get_src_info() and get_stream_size() for video and audio,
+    with a single ffprobe call instead of three.
+
+    Returns a tuple of:
+        - the first video stream's info, as returned by get_src_info()
+        - the video stream size in Bytes
+        - the audio stream size in Bytes
+    """
+    cmd = "ffprobe -loglevel error -show_streams -show_entries packet=codec_type,size -of json '" + input_file + "'"
+    stdout, _ = cmd_utils.run_command(cmd, name="get SRC info and stream sizes for " + input_file)
+    info = json.loads(stdout)
+
+    video_info = next((s for s in info["streams"] if s["codec_type"] == "video"), None)
+    if video_info is None:
+        logger.error("No video stream found in " + input_file)
+        sys.exit(1)
+    videosize = sum(int(p["size"]) for p in info.get("packets", []) if p["codec_type"] == "video")
+    audiosize = sum(int(p["size"]) for p in info.get("packets", []) if p["codec_type"] == "audio")
+
+    return video_info, videosize, audiosize
+
+
 def get_video_frame_info(segment, info_type="packet"):
     """
     Return a list of OrderedDicts with video frame info, in decoding or presentation order
@@ -830,12 +854,11 @@ def encode_segment(segment, overwrite=False):
 
     # Size handling
     width = segment.quality_level.width
-    height = segment.quality_level.height
-    filter_list.append("scale={width}:-2:flags=bicubic".format(**locals()))
+    filter_list.append("scale={width}:-2:flags=bicubic".format(width=width))
 
     # FPS handling
     (fps_cmd, calculated_fps) = _get_fps(segment)
-    orig_fps = float(Fraction(segment.src.stream_info["r_frame_rate"]))
+    orig_fps = segment.src.get_fps()
 
     if fps_cmd:
         adv_select = ''
@@ -873,7 +896,7 @@ def encode_segment(segment, overwrite=False):
     if test_config.type == "long":
         audio_bitrate = segment.quality_level.audio_bitrate
         audio_encoder = segment.audio_coding.encoder
-        audio_encoder_cmd = "-c:a {audio_encoder} -b:a {audio_bitrate}k".format(**locals())
+        audio_encoder_cmd = "-c:a {audio_encoder} -b:a {audio_bitrate}k".format(audio_encoder=audio_encoder, audio_bitrate=audio_bitrate)
     else:
         audio_encoder_cmd = ""
 
@@ -889,7 +912,7 @@ def encode_segment(segment, overwrite=False):
         -video_track_timescale 90000
         -filter:v {filters}
         {audio_encoder_cmd}
-        """.format(**locals())
+        """.format(segment=segment, input_file=input_file, filters=filters, audio_encoder_cmd=audio_encoder_cmd)
 
         # Rate control and other options
         log_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
@@ -945,7 +968,10 @@ def encode_segment(segment, overwrite=False):
         {video_encoder_cmd}
         {audio_encoder_cmd}
         {output_file}
-        """.format(**locals())
+        """.format(
+            ffmpeg_cmd=ffmpeg_cmd, overwrite_spec=overwrite_spec, segment=segment, input_file=input_file,
+            filters=filters, video_encoder_cmd=video_encoder_cmd, audio_encoder_cmd=audio_encoder_cmd,
+            output_file=output_file)
 
     elif segment.video_coding.crf:
         video_encoder_cmd = _get_video_encoder_command_crf(segment)
@@ -961,7 +987,10 @@ def encode_segment(segment, overwrite=False):
         {video_encoder_cmd}
         {audio_encoder_cmd}
         {output_file}
-        """.format(**locals())
+        """.format(
+            ffmpeg_cmd=ffmpeg_cmd, overwrite_spec=overwrite_spec, segment=segment, input_file=input_file,
+            filters=filters, video_encoder_cmd=video_encoder_cmd, audio_encoder_cmd=audio_encoder_cmd,
+            output_file=output_file)
     else:
         logger.error("only 1 or 2 pass or crf encoding implemented")
         sys.exit(1)
@@ -1010,7 +1039,9 @@ def create_avpvs_short(pvs, overwrite=False, scale_avpvs_tosource=False):
     -filter:v scale={avpvs_width}:{avpvs_height}:flags=bicubic,fps={src_framerate},setsar=1/1
     -c:v ffv1 -threads 4 -level 3 -coder 1 -context 1 -slicecrc 1
     -pix_fmt {target_pix_fmt} -c:a flac
-    {output_file}""".format(**locals())
+    {output_file}""".format(
+        overwrite_spec=overwrite_spec, input_file=input_file, avpvs_width=avpvs_width, avpvs_height=avpvs_height,
+        src_framerate=src_framerate, target_pix_fmt=target_pix_fmt, output_file=output_file)
 
     # remove multiple spaces
     cmd = (" ").join(cmd.split())
@@ -1018,9 +1049,11 @@ def create_avpvs_short(pvs, overwrite=False, scale_avpvs_tosource=False):
     return cmd
 
 
-def create_avpvs_segment(seg, pvs, overwrite=False, scale_avpvs_tosource=False):
+def create_avpvs_segment(seg, pvs, overwrite=False, scale_avpvs_tosource=False, threads=4):
     """
     Decode the segments of the PVS without audio and write to a raw output file. Using FFV1.
+
+    threads: number of threads used by the FFV1 encoder for this segment
     """
     cmd = ''
     test_config = pvs.test_config
@@ -1052,8 +1085,11 @@ def create_avpvs_segment(seg, pvs, overwrite=False, scale_avpvs_tosource=False):
 
     segment_duration = seg.get_segment_duration()
 
-    overlay = "-f lavfi -i nullsrc=s={avpvs_width}x{avpvs_height}:d={segment_duration}:r={src_framerate}".format(**locals())
-    complex_filter = "-filter_complex \"[0:v]scale={avpvs_width}:{avpvs_height}:flags=bicubic,fps={src_framerate},setsar=1/1[ol_0];[1:v][ol_0]overlay[vout]\"".format(**locals())
+    overlay = "-f lavfi -i nullsrc=s={avpvs_width}x{avpvs_height}:d={segment_duration}:r={src_framerate}".format(
+        avpvs_width=avpvs_width, avpvs_height=avpvs_height, segment_duration=segment_duration,
+        src_framerate=src_framerate)
+    complex_filter = "-filter_complex \"[0:v]scale={avpvs_width}:{avpvs_height}:flags=bicubic,fps={src_framerate},setsar=1/1[ol_0];[1:v][ol_0]overlay[vout]\"".format(
+        avpvs_width=avpvs_width, avpvs_height=avpvs_height, src_framerate=src_framerate)
 
     cmd = """
     ffmpeg -nostdin
@@ -1062,10 +1098,12 @@ def create_avpvs_segment(seg, pvs, overwrite=False, scale_avpvs_tosource=False):
     {overlay}
     {complex_filter}
     -map "[vout]" -t {segment_duration}
-    -c:v ffv1 -threads 4 -level 3 -coder 1 -context 1 -slicecrc 1
+    -c:v ffv1 -threads {threads} -level 3 -coder 1 -context 1 -slicecrc 1
     -pix_fmt {target_pix_fmt}
     {output_file}
-    """.format(**locals())
+    """.format(
+        overwrite_spec=overwrite_spec, input_file=input_file, overlay=overlay, complex_filter=complex_filter,
+        segment_duration=segment_duration, threads=threads, target_pix_fmt=target_pix_fmt, output_file=output_file)
 
     # remove multiple spaces
     cmd = (" ").join(cmd.split())
@@ -1073,14 +1111,17 @@ def create_avpvs_segment(seg, pvs, overwrite=False, scale_avpvs_tosource=False):
     return cmd
 
 
-def create_avpvs_long_concat(pvs, overwrite=False, scale_avpvs_tosource=False):
+def create_avpvs_long_concat(pvs, overwrite=False):
     """
-    Concatenate the decoded segments of the PVS and write to a raw output file together with SRC audio. Using FFV1 and FLAC.
+    Concatenate the decoded segments of the PVS and write to a raw output file together with SRC audio.
+    The FFV1 video is copied, so no intermediate file without audio is needed.
     """
-    test_config = pvs.test_config
-    target_pix_fmt = pvs.get_pix_fmt_for_avpvs()
+    audio_src = pvs.src.get_src_file_path()
 
-    output_file = pvs.get_tmp_wo_audio_path()
+    if pvs.has_buffering():
+        output_file = pvs.get_avpvs_wo_buffer_file_path()
+    else:
+        output_file = pvs.get_avpvs_file_path()
 
     if overwrite:
         overwrite_spec = "-y"
@@ -1090,32 +1131,22 @@ def create_avpvs_long_concat(pvs, overwrite=False, scale_avpvs_tosource=False):
             logger.warn("output " + output_file + " already exists, will not convert. Use --force to force overwriting.")
             return None
 
-    if scale_avpvs_tosource:
-        src_framerate = pvs.src.get_fps()
-    else:
-        src_framerate = 60.0
-
-    number_of_segments = len(pvs.segments)
-    total_length_for_concatenation = sum([int(s.get_segment_duration()) for s in pvs.segments])
-
-    audio_src = pvs.src.get_src_file_path()
+    total_length_for_concatenation = sum(int(s.get_segment_duration()) for s in pvs.segments)
 
-    # create file list
-    tmp_filelist = pvs.get_avpvs_file_list()
-    tmp_filelist_h = open(tmp_filelist, 'w+')
-    for s in pvs.segments:
-        decoded_segment_path = s.get_tmp_path()
-        line_to_write = 'file ' + decoded_segment_path + '\n'
-        tmp_filelist_h.write(line_to_write)
-    tmp_filelist_h.close()
+    # pass the file list to the concat demuxer via stdin, so no temporary list file is needed
+    decoded_segment_paths = " ".join([shlex.quote(os.path.abspath(s.get_tmp_path())) for s in pvs.segments])
 
     cmd = """
+    printf 'file %s\\n' {decoded_segment_paths} |
     ffmpeg -nostdin
     {overwrite_spec}
-    -f concat -safe 0
-    -i {tmp_filelist}
-    -c:v copy -t {total_length_for_concatenation}
-    {output_file}""".format(**locals())
+    -f concat -safe 0 -protocol_whitelist pipe,file -t {total_length_for_concatenation}
+    -i pipe:0
+    -i {audio_src}
+    -c:v copy -ac 2 -c:a pcm_s16le -map 0:v -map 1:a
+    {output_file}""".format(
+        decoded_segment_paths=decoded_segment_paths, overwrite_spec=overwrite_spec,
+        total_length_for_concatenation=total_length_for_concatenation, audio_src=audio_src, output_file=output_file)
 
     # remove multiple spaces
     cmd = (" ").join(cmd.split())
@@ -1149,14 +1180,12 @@ def simple_encoding(pvs, overwrite, input_file, output_file, vopts, aopts="", fi
             logger.warn("output " + output_file + " already exists, will not convert. Use --force to force overwriting.")
             return None
 
-    test_config = pvs.test_config
-
     cmd = """
     ffmpeg -nostdin
     {overwrite_spec}
     -i {input_file} {filters}
     {vopts} {aopts}
-    {output_file}""".format(**locals())
+    {output_file}""".format(overwrite_spec=overwrite_spec, input_file=input_file, filters=filters, vopts=vopts, aopts=aopts, output_file=output_file)
 
     # remove multiple spaces
     cmd = (" ").join(cmd.split())
@@ -1198,7 +1227,8 @@ def create_cpvs(pvs, post_processing, rawvideo=False, overwrite=False, mobile_cr
 
         # videos with smaller height will be padded to full height
         if avpvs_height < post_processing.coding_height:
-            filters += "," + "pad=width={post_processing.display_width}:height={post_processing.display_height}:x=(ow-iw)/2:y=(oh-ih)/2".format(**locals()) + "'"
+            filters += "," + "pad=width={post_processing.display_width}:height={post_processing.display_height}:x=(ow-iw)/2:y=(oh-ih)/2".format(
+                post_processing=post_processing) + "'"
         else:
             filters += "'"
 
@@ -1206,7 +1236,7 @@ def create_cpvs(pvs, post_processing, rawvideo=False, overwrite=False, mobile_cr
             pc_aopts = "-an"
         else:
             total_duration = str(pvs.hrc.get_long_hrc_duration())
-            pc_aopts = "-ac 2 -c:a pcm_s16le -t {total_duration}".format(**locals())
+            pc_aopts = "-ac 2 -c:a pcm_s16le -t {total_duration}".format(total_duration=total_duration)
 
         cmd = simple_encoding(
                 pvs,
@@ -1218,12 +1248,14 @@ def create_cpvs(pvs, post_processing, rawvideo=False, overwrite=False, mobile_cr
                 filters
             )
     else:
-        mobile_vopts = "-c:v libx264 -preset {mobile_preset} -pix_fmt yuv420p -crf {mobile_crf} -profile:v {mobile_vprofile} -movflags faststart".format(**locals())
+        mobile_vopts = "-c:v libx264 -preset {mobile_preset} -pix_fmt yuv420p -crf {mobile_crf} -profile:v {mobile_vprofile} -movflags faststart".format(
+            mobile_preset=mobile_preset, mobile_crf=mobile_crf, mobile_vprofile=mobile_vprofile)
 
         filters = "-filter:v 'fps=fps=60"
         if (post_processing.display_height != post_processing.coding_height) or (avpvs_height < post_processing.coding_height):
             # special case for tablet where padding is needed, pad to display height
-            pad_filter = "pad=width={post_processing.display_width}:height={post_processing.display_height}:x=(ow-iw)/2:y=(oh-ih)/2".format(**locals())
+            pad_filter = "pad=width={post_processing.display_width}:height={post_processing.display_height}:x=(ow-iw)/2:y=(oh-ih)/2".format(
+                post_processing=post_processing)
             filters += ',' + pad_filter + "'"
         else:
             filters += "'"
@@ -1233,7 +1265,7 @@ def create_cpvs(pvs, post_processing, rawvideo=False, overwrite=False, mobile_cr
         else:
             total_duration = str(pvs.hrc.get_long_hrc_duration())
             aformat_normalize = "-c:a aac -b:a 512k"
-            mobile_aopts = "-c:a aac -b:a 512k -t {total_duration}".format(**locals())
+            mobile_aopts = "-c:a aac -b:a 512k -t {total_duration}".format(total_duration=total_duration)
 
         cmd = simple_encoding(pvs, overwrite, input_file, output_file, mobile_vopts, mobile_aopts, filters)
 
@@ -1247,8 +1279,9 @@ def create_cpvs(pvs, post_processing, rawvideo=False, overwrite=False, mobile_cr
         cmd = " ".join([
             cmd,
             "&&",
-            "TMP={cpvs_path}".format(**locals()),
-            "ffmpeg-normalize {output_file} -o {output_file} -f -nt rms {aformat_normalize}".format(**locals())
+            "TMP={cpvs_path}".format(cpvs_path=cpvs_path),
+            "ffmpeg-normalize {output_file} -o {output_file} -f -nt rms {aformat_normalize}".format(
+                output_file=output_file, aformat_normalize=aformat_normalize)
         ])
 
     return(cmd)
@@ -1264,33 +1297,3 @@ def create_preview(pvs, overwrite=False):
     cmd = simple_encoding(pvs, overwrite, input_file, output_file, "-c:v prores", "-c:a aac")
 
     return(cmd)
-
-
-def audio_mux(pvs, overwrite=False):
-    input_file = pvs.get_tmp_wo_audio_path()
-    audio_src = pvs.src.get_src_file_path()
-
-    if pvs.has_buffering():
-        output_file = pvs.get_avpvs_wo_buffer_file_path()
-    else:
-        output_file = pvs.get_avpvs_file_path()
-
-    if overwrite:
-        overwrite_spec = "-y"
-    else:
-        overwrite_spec = "-n"
-        if os.path.isfile(output_file):
-            logger.warn("output " + output_file + " already exists, will not convert. Use --force to force overwriting.")
-            return None
-
-    cmd = """
-    ffmpeg -nostdin
-    {overwrite_spec}
-    -i {input_file}
-    -i {audio_src}
-    -c:v copy -ac 2 -c:a pcm_s16le -map 0:v -map 1:a
-    {output_file}""".format(**locals())
-
-    cmd = (" ").join(cmd.split())
-
-    return(cmd)
@@ -18,103 +18,151 @@
 Parse the CLI args, common to all scripts
 """
 
-import argparse
 import os
+import sys
+from functools import lru_cache
 
+# default spinner animation used by p03 when inserting stalling events
+SPINNER_DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'util', 'spinner-128-white.png'))
 
-def parse_args(name, script=None):
-    """Return CLI arguments as dic
 
-    Arguments:
-        name {string} -- name of the CLI script
-    """
+def _id_set(ids):
+    """Split a '|'-separated list of IDs into a set"""
+    return frozenset(ids.split('|'))
 
-    parser = argparse.ArgumentParser(description=name,
-                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
-    parser.add_argument(
-        '-c', '--test-config',
+# options shared by all scripts, as (flags, keyword arguments for add_argument)
+_COMMON_ARGS = (
+    (('-c', '--test-config'), dict(
         required=True,
         help='path to test config file at the root of the database folder'
-    )
-    parser.add_argument(
-        '-f', '--force',
+    )),
+    (('-f', '--force'), dict(
         action='store_true',
         help='force overwrite existing output files'
-    )
-    parser.add_argument(
-        '-v', '--verbose',
+    )),
+    (('-v', '--verbose'), dict(
         action='store_true',
         help='print more verbose output'
-    )
-    parser.add_argument(
-        '-n', '--dry-run',
+    )),
+    (('-n', '--dry-run'), dict(
         action='store_true',
         help='only print commands, do not run them'
-    )
-    parser.add_argument(
-        '--filter-src',
+    )),
+    (('--filter-src',), dict(
+        type=_id_set,
         help="Only create specified SRC-IDs. Separate multiple IDs by a '|'"
-    )
-    parser.add_argument(
-        '--filter-hrc',
+    )),
+    (('--filter-hrc',), dict(
+        type=_id_set,
         help="Only create specified HRC-IDs. Separate multiple IDs by a '|'"
-    )
-    parser.add_argument(
-        '--filter-pvs',
+    )),
+    (('--filter-pvs',), dict(
+        type=_id_set,
         help="Only create specified PVS-IDs. Separate multiple IDs by a '|'"
-    )
-    parser.add_argument(
-        '-p', '--parallelism',
+    )),
+    (('-p', '--parallelism'), dict(
         default=4,
         type=int,
         help='number of processes to start in parallel (use more if you have more RAM/CPU cores)'
-    )
-    parser.add_argument(
-        '-r', '--remove-intermediate',
+    )),
+    (('-r', '--remove-intermediate'), dict(
         action='store_true',
         help='remove/delete intermediate files'
-    )
-    parser.add_argument(
-        '-sos', '--skip-online-services',
+    )),
+    (('-sos', '--skip-online-services'), dict(
         help='skip videos coded by online services',
         action='store_true'
-    )
-    parser.add_argument(
-        '-str', '--scripts-to-run',
+    )),
+    (('-str', '--scripts-to-run'), dict(
         help='define which scripts p00_processAll shall execute (e.g. "all", "1234", "34")',
         default='1234'
+    )),
+)
+
+
+def _add_common_args(parser):
+    """Add the options shared by all scripts"""
+    for flags, kwargs in _COMMON_ARGS:
+        parser.add_argument(*flags, **kwargs)
+
+
+def _add_p03_args(parser):
+    """Add the options for p03 only"""
+    parser.add_argument(
+        '-s', '--spinner-path',
+        default=SPINNER_DEFAULT_PATH,
+        help='optional path to a spinner animation to be used when creating stalling events. Default is pointing at: ../util/spinner-128-white.png from parse_args.py point of view.'
     )
-    # Options for p03 only:
-    if script == 3:
-        parser.add_argument(
-            '-s', '--spinner-path',
-            default=os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'util', 'spinner-128-white.png')),
-            help='optional path to a spinner animation to be used when creating stalling events. Default is pointing at: ../util/spinner-128-white.png from parse_args.py point of view.'
-        )
-        parser.add_argument(
-            '-z', '--avpvs-src-fps',
-            action='store_false',
-            help='Do not use the SRC fps for the avpvs but instead upscale to 60 fps all the time'
-        )
-    # Options for p04 only:
-    if script == 4:
-        parser.add_argument(
-            '-e', '--lightweight-preview',
-            action='store_true',
-            help='create lightweight preview files'
-        )
-        parser.add_argument(
-            '-a', '--rawvideo',
-            action='store_true',
-            help='use rawvideo codec and MKV files as output for PC'
-        )
-    # Developer options:
+    parser.add_argument(
+        '-z', '--avpvs-src-fps',
+        action='store_false',
+        help='Do not use the SRC fps for the avpvs but instead upscale to 60 fps all the time'
+    )
+
+
+def _add_p04_args(parser):
+    """Add the options for p04 only"""
+    parser.add_argument(
+        '-e', '--lightweight-preview',
+        action='store_true',
+        help='create lightweight preview files'
+    )
+    parser.add_argument(
+        '-a', '--rawvideo',
+        action='store_true',
+        help='use rawvideo codec and MKV files as output for PC'
+    )
+
+
+def _add_developer_args(parser):
+    """Add the developer options"""
     parser.add_argument(
         '--skip-requirements',
         help="continue running, even if requirements are not fulfilled",
         action='store_true'
     )
 
-    args = parser.parse_args()
-    return args
+
+# script-specific options, by script number
+_SCRIPT_ARGS = {
+    3: _add_p03_args,
+    4: _add_p04_args,
+}
+
+# parsed arguments per (name, script, argv), reused when p00 runs several scripts
+_parsed_args = {}
+
+
+@lru_cache(maxsize=8)
+def _get_parser(name, script=None):
+    """Return the (cached) argument parser for a CLI script
+
+    Arguments:
+        name {string} -- name of the CLI script
+        script {int} -- number of the processing script, or None for p00
+    """
+    # imported here so that modules importing this one do not pay for argparse
+    import argparse
+
+    parser = argparse.ArgumentParser(description=name,
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    _add_common_args(parser)
+    if script in _SCRIPT_ARGS:
+        _SCRIPT_ARGS[script](parser)
+    _add_developer_args(parser)
+
+    return parser
+
+
+def parse_args(name, script=None):
+    """Return CLI arguments as dic
+
+    Arguments:
+        name {string} -- name of the CLI script
+    """
+    key = (name, script, tuple(sys.argv))
+    if key not in _parsed_args:
+        _parsed_args[key] = _get_parser(name, script).parse_args()
+    return _parsed_args[key]
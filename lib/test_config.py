@@ -27,19 +27,80 @@ EXAMPLE:
 
 import os
 import sys
+import hashlib
+import json
+import tempfile
 import yaml
 import re
 import pprint
 import logging
 from fractions import Fraction
+from collections import OrderedDict
+from functools import lru_cache
 import lib.ffmpeg as ffmpeg
-import lib.cmd_utils as cmd_utils
-import pandas as pd
+
+# use the libyaml-based loader if PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
 logger = logging.getLogger('main')
 
 
+def sha1_file(file_path, chunk_size=1024 * 1024):
+    """
+    Return the SHA-1 hex digest of a file, read in chunks
+    """
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _load_path_overrides(override_file):
+    """
+    Return the parsed path overrides file, or an empty dict if it does not exist.
+    The file is only read once per process.
+    """
+    if not os.path.isfile(override_file):
+        return {}
+    with open(override_file) as f:
+        return yaml.load(f, Loader=YamlLoader) or {}
+
+
+def _get_optional_float(data, key):
+    """
+    Return data[key] as float, or None if the key is not set
+    """
+    value = data.get(key)
+    return float(value) if value is not None else None
+
+
 class Pvs:
+    # AVPVS pixel format to CPVS pixel format and video codec
+    # TODO: check if this is really the only possible mapping? What about 444?
+    CPVS_FORMAT_MAP_AUTO = {
+        "yuv420p": {
+            "pix_fmt": "uyvy422",
+            "vcodec": "rawvideo",
+        },
+        "yuv422p": {
+            "pix_fmt": "uyvy422",
+            "vcodec": "rawvideo",
+        },
+        "yuv420p10le": {
+            "pix_fmt": "yuv422p10le",
+            "vcodec": "v210",
+        },
+        "yuv422p10le": {
+            "pix_fmt": "yuv422p10le",
+            "vcodec": "v210"
+        }
+    }
+
     def __init__(self, pvs_id, test_config, src, hrc):
         self.pvs_id = pvs_id
         self.test_config = test_config
@@ -51,54 +112,42 @@ class Pvs:
             max_width, max_height = self.hrc.get_max_res()
             src_width = self.src.stream_info["width"]
             if src_width < max_width:
-                logger.error("PVS {self.pvs_id} uses {self.hrc.hrc_id}, which specifies a quality level with maximum width {max_width}. The {src} is only {src_width} wide and would have to be upscaled. Choose a SRC with higher resolution, fix the SRC, or use an HRC with lower maximum resolution.".format(**locals()))
+                logger.error("PVS {pvs_id} uses {hrc_id}, which specifies a quality level with maximum width {max_width}. The {src} is only {src_width} wide and would have to be upscaled. Choose a SRC with higher resolution, fix the SRC, or use an HRC with lower maximum resolution.".format(
+                    pvs_id=self.pvs_id, hrc_id=self.hrc.hrc_id, max_width=max_width, src=src, src_width=src_width))
                 sys.exit(1)
 
         # a list of segments this PVS needs
         # will be added later by _create_required_segments()
         self.segments = []
 
+        avpvs_path = self.test_config.get_avpvs_path()
+        self.avpvs_wo_buffer_file_path = os.path.join(avpvs_path, self.pvs_id + "_concat_wo_buffer.avi")
+        self.avpvs_file_path = os.path.join(avpvs_path, self.pvs_id + ".avi")
+        self.preview_file_path = os.path.join(self.test_config.get_cpvs_path(), self.pvs_id + '_preview.mov')
+        self.logfile_path = os.path.join(self.test_config.get_logs_path(), self.get_logfile_name())
+
+        # cached results of get_pix_fmt_for_avpvs() and get_vcodec_and_pix_fmt_for_cpvs()
+        self._avpvs_pix_fmt = None
+        self._cpvs_vcodec_and_pix_fmt = {}
+
     def is_online(self):
         """
-        Whether any of this PVS's segments is online
+        Whether any of this PVS's segments is online; they all share the HRC's video coding.
+        YouTube PVSes have no segments and are therefore not online.
         """
-        return any([s.video_coding.is_online for s in self.segments])
+        return bool(self.segments) and self.hrc.video_coding.is_online
 
     def get_avpvs_wo_buffer_file_path(self):
         """
         Get the AVPVS file path before stalling added
         """
-        return os.path.join(
-            self.test_config.get_avpvs_path(),
-            self.pvs_id + "_concat_wo_buffer.avi"
-        )
-
-    def get_tmp_wo_audio_path(self):
-        """
-        Get the AVPVS file path after concatenation but before adding audio
-        """
-        return os.path.join(
-            self.test_config.get_avpvs_path(),
-            self.pvs_id + "_concat_wo_audio.avi"
-        )
+        return self.avpvs_wo_buffer_file_path
 
     def get_avpvs_file_path(self):
         """
         Get the AVPVS file path after concatenation and possibly stalling added
         """
-        return os.path.join(
-            self.test_config.get_avpvs_path(),
-            self.pvs_id + ".avi"
-        )
-
-    def get_avpvs_file_list(self):
-        """
-        Get the file containing a list of temporary avpvs decoded segments
-        """
-        return os.path.join(
-            self.test_config.get_avpvs_path(),
-            self.pvs_id + "_tmp_filelist.txt"
-            )
+        return self.avpvs_file_path
 
     def get_cpvs_file_path(self, context="pc", rawvideo=False):
         """
@@ -120,7 +169,7 @@ class Pvs:
             ext = ".mp4"
 
         cpvs_name = self.pvs_id + "_" + context[0:2].upper() + ext
-        if not re.match(self.test_config.REGEX_CPVS_ID, cpvs_name):
+        if not self.test_config.PATTERN_CPVS_ID.match(cpvs_name):
             logger.error("CPVS ID " + cpvs_name + " does not correspond to regex!")
             sys.exit(1)
 
@@ -130,10 +179,7 @@ class Pvs:
         """
         Get the preview file path
         """
-        return os.path.join(
-            self.test_config.get_cpvs_path(),
-            self.pvs_id + '_preview.mov'
-        )
+        return self.preview_file_path
 
     def __repr__(self):
         return "<PVS " + self.pvs_id + ">"
@@ -160,14 +206,16 @@ class Pvs:
         """
         AVPVS pixel format is simply the unique pixel format of the segments
         """
-        target_pix_fmts = set([seg.target_pix_fmt for seg in self.segments])
-        if len(target_pix_fmts) > 1:
-            logger.error("Segments for PVS " + str(self) + " use different target pixel formats!")
-            sys.exit(1)
-        return list(target_pix_fmts)[0]
+        if self._avpvs_pix_fmt is None:
+            target_pix_fmts = {seg.target_pix_fmt for seg in self.segments}
+            if len(target_pix_fmts) > 1:
+                logger.error("Segments for PVS " + str(self) + " use different target pixel formats!")
+                sys.exit(1)
+            self._avpvs_pix_fmt = list(target_pix_fmts)[0]
+        return self._avpvs_pix_fmt
 
     def get_logfile_path(self):
-        return os.path.join(self.test_config.get_logs_path(), self.get_logfile_name())
+        return self.logfile_path
 
     def get_logfile_name(self):
         return self.pvs_id + ".log"
@@ -180,37 +228,21 @@ class Pvs:
         Arguments:
           - rawvideo {bool} -- if true, always use rawvideo codec, even for 10-bit (otherwise will use v210)
         """
-        avpvs_format = self.get_pix_fmt_for_avpvs()
+        if rawvideo in self._cpvs_vcodec_and_pix_fmt:
+            return self._cpvs_vcodec_and_pix_fmt[rawvideo]
 
-        # TODO: check if this is really the only possible mapping? What about 444?
-        format_map_auto = {
-            "yuv420p": {
-                "pix_fmt": "uyvy422",
-                "vcodec": "rawvideo",
-            },
-            "yuv422p": {
-                "pix_fmt": "uyvy422",
-                "vcodec": "rawvideo",
-            },
-            "yuv420p10le": {
-                "pix_fmt": "yuv422p10le",
-                "vcodec": "v210",
-            },
-            "yuv422p10le": {
-                "pix_fmt": "yuv422p10le",
-                "vcodec": "v210"
-            }
-        }
+        avpvs_format = self.get_pix_fmt_for_avpvs()
 
         if rawvideo:
             target_pix_fmt = avpvs_format
             vcodec = "rawvideo"
         else:
-            if avpvs_format not in format_map_auto.keys():
+            if avpvs_format not in self.CPVS_FORMAT_MAP_AUTO:
                 logger.error("Cannot use input pixel format " + str(avpvs_format) + " for CPVS " + str(self))
-            target_pix_fmt = format_map_auto[avpvs_format]["pix_fmt"]
-            vcodec = format_map_auto[avpvs_format]["vcodec"]
+            target_pix_fmt = self.CPVS_FORMAT_MAP_AUTO[avpvs_format]["pix_fmt"]
+            vcodec = self.CPVS_FORMAT_MAP_AUTO[avpvs_format]["vcodec"]
 
+        self._cpvs_vcodec_and_pix_fmt[rawvideo] = (vcodec, target_pix_fmt)
         return (vcodec, target_pix_fmt)
 
 
@@ -234,16 +266,23 @@ class Hrc:
         self.audio_coding = audio_coding
         self.event_list = event_list
 
+        # encoders that may be used for each video codec
+        online_coders = set(self.test_config.ONLINE_CODERS)
+        allowed_encoders = {
+            "vp9": online_coders | {"libvpx-vp9"},
+            "h265": online_coders | {"libx265"},
+            "h264": online_coders | {"libx264"},
+        }
+        # YouTube codings have no encoder, their events are skipped below
+        encoder = getattr(self.video_coding, "encoder", None)
+
         for event in self.event_list:
-            if event.event_type == "stall" or event.event_type == "youtube":
+            if event.event_type in ("stall", "youtube"):
                 continue
 
             video_codec = event.quality_level.video_codec
-            encoder = self.video_coding.encoder
 
-            if (video_codec == "vp9" and encoder != "libvpx-vp9" and encoder not in self.test_config.ONLINE_CODERS) \
-               or (video_codec == "h265" and encoder != "libx265" and encoder not in self.test_config.ONLINE_CODERS) \
-               or (video_codec == "h264" and encoder != "libx264" and encoder not in self.test_config.ONLINE_CODERS):
+            if video_codec in allowed_encoders and encoder not in allowed_encoders[video_codec]:
                 logger.error("In HRC " + self.hrc_id + ", quality level " + str(event.quality_level) + " and video coding " + str(self.video_coding) + " specify different codecs")
                 sys.exit(1)
 
@@ -274,50 +313,50 @@ class Hrc:
         # will be added later by _create_required_segments()
         self.segments = set()
 
-        self.buffer_events = []
-        if self.has_buffering():
-            self.buffer_events = self.get_buff_events_media_time()
+        # event types and durations are fixed once the HRC is created, so
+        # the stalling information can be gathered in a single pass here
+        self._has_buffering = any(event.event_type == "stall" for event in self.event_list)
+        self._buff_events_media_time = []
+        self._buff_events_wallclock_time = []
+        if self._has_buffering:
+            total_media_dur = 0
+            total_dur = 0
+            for event in self.event_list:
+                if event.event_type == "stall":
+                    self._buff_events_media_time.append([total_media_dur, event.duration])
+                    self._buff_events_wallclock_time.append([total_dur, event.duration])
+                else:
+                    total_media_dur += event.duration
+                total_dur += event.duration
+
+        self.buffer_events = self._buff_events_media_time
+
+        # total playout duration of the quality level events, shared by all PVSes of this HRC
+        self.total_quality_event_duration = sum(
+            event.duration for event in self.event_list
+            if event.event_type == "quality_level" and event.duration != "src_duration"
+        )
 
     def has_buffering(self):
-        for event in self.event_list:
-            if event.event_type == "stall":
-                return True
-        return False
+        return self._has_buffering
 
     def has_stalling(self):
-        return self.has_buffering()
+        return self._has_buffering
 
     def get_buff_events_media_time(self):
         """
-        Return the buff events in the format required for .buff files in wallclock time
+        Return the buff events in the format required for .buff files in media time
         """
-        buff_events = []
-        if self.has_buffering():
-            total_media_dur = 0
-            for event in self.event_list:
-                if event.event_type == "stall":
-                    stall_dur = event.duration
-                    buff_events.append([total_media_dur, stall_dur])
-                else:
-                    total_media_dur += event.duration
-        return buff_events
+        return self._buff_events_media_time
 
     def get_long_hrc_duration(self):
-        return sum([float(event.duration) for event in self.event_list])
+        return sum(float(event.duration) for event in self.event_list)
 
     def get_buff_events_wallclock_time(self):
         """
         Return the buff events in the format required for .buff files in wallclock time
         """
-        buff_events = []
-        if self.has_buffering():
-            total_dur = 0
-            for event in self.event_list:
-                if event.event_type == "stall":
-                    stall_dur = event.duration
-                    buff_events.append([total_dur, stall_dur])
-                total_dur += event.duration
-        return buff_events
+        return self._buff_events_wallclock_time
 
     def get_max_res(self):
         """
@@ -343,6 +382,24 @@ class Hrc:
 
 
 class Segment:
+    # chroma subsampling found in the SRC pixel format to target pixel format;
+    # 4:4:4 will always be changed to 4:2:2, all others are harmonized
+    # to yuv422p or yuv420p.
+    PIX_FMT_MAP = {
+        "444": "yuv422p",
+        "422": "yuv422p",
+        "rgb": "yuv422p",
+        "420": "yuv420p",
+    }
+    PATTERN_PIX_FMT = re.compile(r"444|422|rgb|420")
+
+    # there can be thousands of segments in long tests, so avoid a __dict__ per instance
+    __slots__ = ('index', 'src', 'test_config', 'quality_level', 'video_coding', 'audio_coding',
+                 'start_time', 'duration', 'end_time', '_key', '_hash', '_sort_key',
+                 'video_frame_info', 'audio_frame_info', 'segment_info', '_exists',
+                 'ext', 'filename', 'file_path', 'tmp_path', 'logfile_path',
+                 'target_pix_fmt', 'target_video_bitrate')
+
     def __init__(self, index, src, quality_level, video_coding, audio_coding, start_time, duration):
         """
         One segment is an actual video segment belonging to a SRC, encoded with
@@ -368,13 +425,28 @@ class Segment:
         self.duration = duration
         self.end_time = self.start_time + self.duration
 
+        # identity of the segment, see __hash__(); includes the index, since it is part of the file name
+        self._key = (self.src, self.quality_level, self.video_coding, self.audio_coding, self.index,
+                     self.start_time, self.duration)
+        self._hash = hash(self._key)
+        # sort order, see __lt__()
+        self._sort_key = (src.src_id, self.start_time, quality_level.ql_id, self.duration)
+
         self.video_frame_info = None
         self.audio_frame_info = None
         self.segment_info = None
+        self._exists = False
 
-        self.filename = self.get_filename()
+        self.ext = self._get_extension()
+        # Example: P2STR00_SRC000_Q0_0049_98-100.mp4
+        # FIXME: file name generated with truncating segment timestamps,
+        # will this cause problems?
+        self.filename = "{}_{}_{}_{:04}_{}-{}.{}".format(
+            self.test_config.database_id, src.src_id, quality_level.ql_id,
+            index, int(start_time), int(self.end_time), self.ext)
         self.file_path = os.path.join(self.test_config.get_video_segments_path(), self.filename)
         self.tmp_path = os.path.join(src.test_config.get_avpvs_path(), 'tmp_' + self.filename + '.avi')
+        self.logfile_path = os.path.join(self.test_config.get_logs_path(), self.get_logfile_name())
 
         self.target_pix_fmt = None
         self.target_video_bitrate = None
@@ -398,13 +470,10 @@ class Segment:
         Set the target bitrate for the Segment based on the encoding complexity of the SRC.
         """
         if self.test_config.is_complex():
-            multiple_bitrates = str(self.quality_level.video_bitrate).split('/')
-            multiple_bitrates = [float(aa) for aa in multiple_bitrates]
-            multiple_bitrates.sort()
+            multiple_bitrates = self.quality_level.video_bitrates
 
             if len(multiple_bitrates) > 1:
-                segment_complexity_level = self.test_config.complexity_dict[self.src.get_src_file_name()]
-                if segment_complexity_level > 1:
+                if self.src.get_complexity_class() > 1:
                     self.target_video_bitrate = multiple_bitrates[1]
                 else:
                     self.target_video_bitrate = multiple_bitrates[0]
@@ -427,25 +496,30 @@ class Segment:
 
         src_pix_fmt = self.src.stream_info["pix_fmt"]
 
-        # 4:4:4 will always be changed to 4:2:2, all others
-        # are harmonized to yuv422p or yuv420p.
-        if ("444" in src_pix_fmt) or \
-           ("422" in src_pix_fmt) or \
-           ("rgb" in src_pix_fmt):
-            self.target_pix_fmt = "yuv422p"
-        elif "420" in src_pix_fmt:
-            self.target_pix_fmt = "yuv420p"
-        else:
+        match = self.PATTERN_PIX_FMT.search(src_pix_fmt)
+        if not match:
             logger.error("Unknown SRC pixel format: " + str(src_pix_fmt))
             sys.exit(1)
+        self.target_pix_fmt = self.PIX_FMT_MAP[match.group(0)]
 
         # 10-Bit handling
         if self.src.uses_10_bit():
-            self.target_pix_fmt += "10le"
+            # share one string object between all 10-bit segments
+            self.target_pix_fmt = sys.intern(self.target_pix_fmt + "10le")
 
         if (self.quality_level.video_codec == "h264") and (self.video_coding.encoder.casefold() == "bitmovin"):
             self.target_pix_fmt = "yuv420p"
 
+    def _get_extension(self):
+        """
+        Return the container file extension for the segment's codec and encoder.
+        """
+        ext = self.video_coding.segment_ext.get(self.quality_level.video_codec)
+        if ext is None:
+            logger.error("Wrong video codec for quality level " + str(self.quality_level))
+            sys.exit(1)
+        return ext
+
     def get_filename(self):
         """
         Return the filename of the segment to be generated.
@@ -453,28 +527,7 @@ class Segment:
 
         Here, "seq" is the quality index of the segment.
         """
-        if self.quality_level.video_codec == "h264" or self.quality_level.video_codec == "h265":
-            self.ext = "mp4"
-        elif self.video_coding.encoder == "youtube" and self.quality_level.video_codec == "vp9":
-            self.ext = "webm"
-        elif self.video_coding.encoder.casefold() == "bitmovin" and self.quality_level.video_codec == "vp9":
-            self.ext = "mkv"
-        elif self.quality_level.video_codec == "vp9":
-            self.ext = "mp4"
-        else:
-            logger.error("Wrong video codec for quality level " + self.quality_level)
-            sys.exit(1)
-
-        # Example: P2STR00_SRC000_Q0_98-100.mp4
-        # FIXME: file name generated with truncating segment timestamps,
-        # will this cause problems?
-        return "_".join([
-                self.test_config.database_id,
-                self.src.src_id,
-                self.quality_level.ql_id,
-                format(self.index, '04'),
-                str(int(self.start_time)) + '-' + str(int(self.end_time))
-            ]) + "." + self.ext
+        return self.filename
 
     def get_segment_file_path(self):
         """
@@ -486,30 +539,64 @@ class Segment:
         """
         Return SHA-1 hash of the encoded video file
         """
-        _, ret, _ = cmd_utils.shell_call(["sha1sum", self.file_path], raw=False)
-        shasum = ret.split(" ")[0]
-        return shasum
+        return sha1_file(self.file_path)
 
     def get_logfile_hash(self):
         """
         Return SHA-1 hash of the logfile
         """
-        _, ret, _ = cmd_utils.shell_call(["sha1sum", self.get_logfile_path()], raw=False)
-        shasum = ret.split(" ")[0]
-        return shasum
+        return sha1_file(self.get_logfile_path())
 
     def get_logfile_path(self):
-        return os.path.join(self.test_config.get_logs_path(), self.get_logfile_name())
+        return self.logfile_path
 
     def get_logfile_name(self):
-        return os.path.splitext(self.get_filename())[0] + ".log"
+        return os.path.splitext(self.filename)[0] + ".log"
+
+    def get_probe_cache_path(self):
+        """
+        Return the path to the file caching ffprobe results for this segment, in the logs folder
+        """
+        return os.path.join(self.test_config.get_logs_path(), self.filename + ".probe.json")
+
+    def _get_cached_probe_info(self, info_type, probe_function):
+        """
+        Return the ffprobe results of a given type for this segment. All types are cached
+        in one file and reused as long as the segment file is unchanged.
+        """
+        cache_path = self.get_probe_cache_path()
+        file_stat = os.stat(self.file_path)
+        file_id = [file_stat.st_mtime_ns, file_stat.st_size]
+
+        cached = None
+        try:
+            with open(cache_path) as f_in:
+                cached = json.load(f_in, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            # missing or broken cache file, probe again
+            pass
+        if not isinstance(cached, dict) or cached.get("file_id") != file_id:
+            cached = OrderedDict([("file_id", file_id)])
+
+        if info_type not in cached:
+            cached[info_type] = probe_function(self)
+            # write to a temporary file first, so an interrupted write never leaves a broken cache
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), prefix=self.filename, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f_out:
+                    json.dump(cached, f_out)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        return cached[info_type]
 
     def get_video_frame_info(self):
         """
         Return a list of dicts with video frame info, in presentation order
         """
         if not self.video_frame_info:
-            self.video_frame_info = ffmpeg.get_video_frame_info(self)
+            self.video_frame_info = self._get_cached_probe_info("video_frame_info", ffmpeg.get_video_frame_info)
         return self.video_frame_info
 
     def get_audio_frame_info(self):
@@ -517,7 +604,7 @@ class Segment:
         Return a list of dicts with audio sample info, in presentation order
         """
         if not self.audio_frame_info:
-            self.audio_frame_info = ffmpeg.get_audio_frame_info(self)
+            self.audio_frame_info = self._get_cached_probe_info("audio_frame_info", ffmpeg.get_audio_frame_info)
         return self.audio_frame_info
 
     def get_segment_info(self):
@@ -525,9 +612,17 @@ class Segment:
         Return a dict with segment info
         """
         if not self.segment_info:
-            self.segment_info = ffmpeg.get_segment_info(self)
+            self.segment_info = self._get_cached_probe_info("segment_info", ffmpeg.get_segment_info)
         return self.segment_info
 
+    def load_probe_info(self):
+        """
+        Load segment info, video and audio frame info in one go
+        """
+        self.get_segment_info()
+        self.get_video_frame_info()
+        self.get_audio_frame_info()
+
     def get_segment_duration(self):
         """
         Returns the length of the segment in seconds, as an int
@@ -550,18 +645,26 @@ class Segment:
         Overwrite internal hash method to make sure that two segments
         are seen as equal when they are from the same SRC, have the same
         audio and video coding, use the same quality level, and have the
-        same start time / duration
+        same index and start time / duration, i.e. map to the same file
         """
-        return hash((self.src, self.quality_level, self.video_coding, self.audio_coding, self.start_time, self.duration))
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, Segment):
+            return NotImplemented
+        return self._hash == other._hash and self._key == other._key
 
     def __lt__(self, other):
         """
         Override sorting method; sort by SRC, start time, QL
         """
-        return ((self.src.src_id, self.start_time, self.quality_level.ql_id, self.duration) < (other.src.src_id, other.start_time, other.quality_level.ql_id, self.duration))
+        return self._sort_key < other._sort_key
 
     def exists(self):
-        return(os.path.isfile(os.path.join(self.test_config.get_video_segments_path(),self.get_filename())))
+        # only remember positive results, the file may still be created later
+        if not self._exists:
+            self._exists = os.path.isfile(self.file_path)
+        return self._exists
 
 
 class Event:
@@ -614,6 +717,10 @@ class Src:
         self.segments = set()
 
         self.duration = None
+        self.complexity_class = None
+        self.fps = None
+        self.stream_info = None
+        self._exists = False
 
         if isinstance(data, str):
             self.filename = data
@@ -630,6 +737,9 @@ class Src:
         """
         Locate the SRC file and get the stream info
         """
+        # SRCs are shared between PVSes, only look them up once
+        if self.stream_info is not None:
+            return
         self.locate_src_file()
         self.stream_info = ffmpeg.get_src_info(self)
 
@@ -643,7 +753,7 @@ class Src:
         """
         Return the duration of the SRC, using the ffmpeg functions
         """
-        if not self.duration:
+        if self.duration is None:
             self.duration = ffmpeg.get_segment_info(self)["video_duration"]
         return self.duration
 
@@ -659,14 +769,24 @@ class Src:
                 logger.error("Make sure you have all the SRCs in this folder, or set the folder to a different one using the processingchain_defaults.yaml file.")
                 sys.exit(1)
             else:
-                logger.debug("SRC " + self.filename + " not found in " + self.test_config.get_src_vid_path() + ", " +
-                             "falling back to local folder at " + self.test_config.get_src_vid_local_path())
+                logger.debug("SRC %s not found in %s, falling back to local folder at %s",
+                             self.filename, self.test_config.get_src_vid_path(), self.test_config.get_src_vid_local_path())
+
+    def get_complexity_class(self):
+        """
+        Return the encoding complexity class of the SRC, from the complexity classification
+        """
+        if self.complexity_class is None:
+            self.complexity_class = self.test_config.complexity_dict[self.get_src_file_name()]
+        return self.complexity_class
 
     def get_fps(self):
         """
         Return the SRC FPS as float
         """
-        return float(Fraction(self.stream_info["r_frame_rate"]))
+        if self.fps is None:
+            self.fps = float(Fraction(self.stream_info["r_frame_rate"]))
+        return self.fps
 
     def __repr__(self):
         return "<" + self.src_id + ", File: " + self.filename + ">"
@@ -684,20 +804,31 @@ class Src:
         return(self.filename)
 
     def exists(self):
-        return(os.path.isfile(self.file_path))
+        # only remember positive results, the file may still be created later
+        if not self._exists:
+            self._exists = os.path.isfile(self.file_path)
+        return self._exists
 
 
 class Coding:
     def __init__(self, coding_id, test_config, data):
         self.coding_id = coding_id
         self.test_config = test_config
-        self.coding_type = data['type']
+        self.coding_type = sys.intern(data['type'])
 
         self.is_online = None
 
         if self.coding_type == "video":
-            self.encoder = data['encoder']
+            self.encoder = sys.intern(data['encoder'])
             self.is_online = True if self.encoder in self.test_config.ONLINE_CODERS else False
+            # segment file extension per video codec
+            if self.encoder == "youtube":
+                vp9_ext = "webm"
+            elif self.encoder.casefold() == "bitmovin":
+                vp9_ext = "mkv"
+            else:
+                vp9_ext = "mp4"
+            self.segment_ext = {"h264": "mp4", "h265": "mp4", "vp9": vp9_ext}
             if data['encoder'].casefold() in ['youtube', 'vimeo']:  # or 'vimeo' or 'dailymotion':
                 self.protocol = data['protocol']
                 return
@@ -709,13 +840,13 @@ class Coding:
                 if 'minGop' in data:
                     self.min_gop = data['minGop']
             else:
-                if 'passes' in data.keys():
+                if 'passes' in data:
                     self.passes = int(data['passes'])
                     if self.passes not in [1, 2]:
                         logger.error("only 1-pass or 2-pass encoding allowed, error in coding " + self.coding_id)
                         sys.exit(1)
                 else:
-                    if 'crf' in data.keys():
+                    if 'crf' in data:
                         crf = int(data['crf'])
                         if self.encoder == "libvpx-vp9" and crf not in range(0, 63):
                             logger.error("only crf values between 0 to 63 allowed, error in coding " + self.coding_id)
@@ -739,12 +870,6 @@ class Coding:
             self.iframe_interval = None
             self.bframes = None
             self.preset = None
-            self.minrate_factor = None
-            self.maxrate_factor = None
-            self.bufsize_factor = None
-            self.minrate = None
-            self.maxrate = None
-            self.bufsize = None
 
             if 'profile' in data:
                 logger.warning("Setting profile in " + self.coding_id + " is not supported anymore.")
@@ -784,23 +909,12 @@ class Coding:
                     logger.error("quality must be 'good' or 'best'")
                     sys.exit(1)
 
-            if 'minrateFactor' in data:
-                self.minrate_factor = float(data['minrateFactor'])
-
-            if 'maxrateFactor' in data:
-                self.maxrate_factor = float(data['maxrateFactor'])
-
-            if 'bufsizeFactor' in data:
-                self.bufsize_factor = float(data['bufsizeFactor'])
-
-            if 'minrate' in data:
-                self.minrate = float(data['minrate'])
-
-            if 'maxrate' in data:
-                self.maxrate = float(data['maxrate'])
-
-            if 'bufsize' in data:
-                self.bufsize = float(data['bufsize'])
+            self.minrate_factor = _get_optional_float(data, 'minrateFactor')
+            self.maxrate_factor = _get_optional_float(data, 'maxrateFactor')
+            self.bufsize_factor = _get_optional_float(data, 'bufsizeFactor')
+            self.minrate = _get_optional_float(data, 'minrate')
+            self.maxrate = _get_optional_float(data, 'maxrate')
+            self.bufsize = _get_optional_float(data, 'bufsize')
 
             # enforce that both maxrate and bufsize are specified
             if self.encoder != "libvpx-vp9" and \
@@ -809,7 +923,7 @@ class Coding:
                 sys.exit(1)
 
         elif self.coding_type == "audio":
-            self.encoder = data['encoder']
+            self.encoder = sys.intern(data['encoder'])
 
         else:
             logger.error("Wrong coding type: " + self.coding_type + ", must be audio or video, error in  coding " + self.coding_id)
@@ -820,25 +934,35 @@ class Coding:
 
 
 class YoutubeCoding:
+    __slots__ = ('coding_id', 'test_config', 'is_online', 'segment_ext')
+
     def __init__(self, coding_id, test_config):
         self.coding_id = coding_id
         self.test_config = test_config
+        self.is_online = True
+        self.segment_ext = {"h264": "mp4", "h265": "mp4", "vp9": "webm"}
 
     def __repr__(self):
         return "<Coding " + self.coding_id + ">"
 
 
 class QualityLevel:
+    __slots__ = ('ql_id', 'test_config', 'index', 'video_codec', 'video_bitrate', 'video_bitrates',
+                 'width', 'height', 'fps', 'audio_codec', 'audio_bitrate', 'hrcs')
+
     def __init__(self, ql_id, test_config, data):
         self.ql_id = ql_id
         self.test_config = test_config
 
         self.index = data['index']
-        self.video_codec = data['videoCodec']
+        self.video_codec = sys.intern(data['videoCodec'])
 
         self.video_bitrate = None
+        self.video_bitrates = None
         if 'videoBitrate' in data:
             self.video_bitrate = data['videoBitrate']
+            # bitrates per SRC complexity class, specified like "1000/2000"
+            self.video_bitrates = sorted([float(b) for b in str(self.video_bitrate).split('/')])
 
         self.width = int(data['width'])
         self.height = int(data['height'])
@@ -859,6 +983,9 @@ class QualityLevel:
 
 
 class PostProcessing:
+    __slots__ = ('test_config', 'processing_type', 'display_width', 'display_height',
+                 'coding_width', 'coding_height')
+
     def __init__(self, test_config, data):
         self.test_config = test_config
         self.processing_type = data['type']
@@ -924,9 +1051,18 @@ class TestConfig:
     REGEX_CODING_ID = r'(A|V)C[\d]+'
     REGEX_SRC_ID = r'SRC[\d]{3,5}'
     REGEX_HRC_ID = r'HRC[\d]{3,4}'
-    REGEX_PVS_ID = r'P2(S|L)(TR|PT|IT|VL|XM)[\d]{2,3}_SRC[\d]{3,5}_HRC[\d]{3,4}'
+    REGEX_PVS_ID = r'P2(S|L)(TR|PT|IT|VL|XM)[\d]{2,3}_(SRC[\d]{3,5})_(HRC[\d]{3,4})'
     REGEX_CPVS_ID = r'P2(S|L)(TR|PT|IT|VL|XM)[\d]{2,3}_SRC[\d]{3,5}_HRC[\d]{3,4}_(PC|MO|TA)'
 
+    # compiled once, since IDs are matched in loops over the whole config
+    PATTERN_DATABASE_ID = re.compile(REGEX_DATABASE_ID)
+    PATTERN_QL_ID = re.compile(REGEX_QL_ID)
+    PATTERN_CODING_ID = re.compile(REGEX_CODING_ID)
+    PATTERN_SRC_ID = re.compile(REGEX_SRC_ID)
+    PATTERN_HRC_ID = re.compile(REGEX_HRC_ID)
+    PATTERN_PVS_ID = re.compile(REGEX_PVS_ID)
+    PATTERN_CPVS_ID = re.compile(REGEX_CPVS_ID)
+
     # required minimum version of YAML file syntax
     REQUIRED_YAML_SYNTAX_VERSION = 6
 
@@ -937,24 +1073,15 @@ class TestConfig:
         Load the YAML file and create test config.
         Arguments:
             - yaml_filename {str} -- path to YAML file
-            - filter_srcs {str} -- filter string for SRC
-            - filter_hrcs {str} -- filter string for HRC
-            - filter_pvses {str} -- filter string for PVSES
+            - filter_srcs {str|set} -- filter string for SRC, or set of SRC IDs
+            - filter_hrcs {str|set} -- filter string for HRC, or set of HRC IDs
+            - filter_pvses {str|set} -- filter string for PVSES, or set of PVS IDs
         """
         self.yaml_file = yaml_filename
 
-        if filter_srcs:
-            self.filter_srcs = filter_srcs.split("|")
-        else:
-            self.filter_srcs = []
-        if filter_hrcs:
-            self.filter_hrcs = filter_hrcs.split("|")
-        else:
-            self.filter_hrcs = []
-        if filter_pvses:
-            self.filter_pvses = filter_pvses.split("|")
-        else:
-            self.filter_pvses = []
+        self.filter_srcs = self._parse_filter(filter_srcs)
+        self.filter_hrcs = self._parse_filter(filter_hrcs)
+        self.filter_pvses = self._parse_filter(filter_pvses)
 
         self.database_dir = os.path.dirname(self.yaml_file)
         self.complex_bitrates = False
@@ -962,7 +1089,7 @@ class TestConfig:
         self._check_names()
 
         with open(self.yaml_file) as f_in:
-            self.data = yaml.load(f_in, Loader=yaml.FullLoader)
+            self.data = yaml.load(f_in, Loader=YamlLoader)
 
         self._load_paths()
         self._parse_data_from_yaml()
@@ -970,6 +1097,17 @@ class TestConfig:
             self._parse_complexity()
         self._create_required_segments()
 
+    @staticmethod
+    def _parse_filter(filter_ids):
+        """
+        Return the set of IDs to filter for, from a '|'-separated string or an iterable of IDs
+        """
+        if not filter_ids:
+            return frozenset()
+        if isinstance(filter_ids, str):
+            return frozenset(filter_ids.split("|"))
+        return frozenset(filter_ids)
+
     def _check_names(self):
         """
         Check if the name of the YAML file is correct, also if the name of the database folder
@@ -982,7 +1120,7 @@ class TestConfig:
 
         # check for YAML DB ID
         self.yaml_basename = os.path.splitext(os.path.basename(self.yaml_file))[0]
-        if not re.match(self.REGEX_DATABASE_ID, self.yaml_basename):
+        if not self.PATTERN_DATABASE_ID.match(self.yaml_basename):
             logger.error("YAML filename does not have correct ID syntax: " + self.REGEX_DATABASE_ID)
             sys.exit(1)
 
@@ -1031,31 +1169,29 @@ class TestConfig:
 
         # load paths from override file
         override_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'processingchain_defaults.yaml')
-        if os.path.isfile(override_file):
-            # load YAML file
-            with open(override_file) as f:
-                overrides = yaml.load(f, Loader=yaml.FullLoader)
-            # set overrides if dir exists
-            if overrides:
-                for key, path in overrides.items():
-                    # only override valid keys
-                    if key in self.path_mapping.keys():
-                        if not os.path.isdir(path):
-                            logger.error("path " + path + ", as specified in processingchain_defaults.yaml, does not exist in the virtual machine! Please create it first.")
-                            sys.exit(1)
-                        if not os.access(path, os.W_OK):
-                            logger.error("path " + path + ", as specified in processingchain_defaults.yaml, does not have write permissions for current user!")
-                            sys.exit(1)
-                        self.path_mapping[key] = path
-                    else:
-                        logger.warn(key + " is not a valid path identifier, ignoring")
+        # set overrides if dir exists
+        for key, path in _load_path_overrides(override_file).items():
+            # only override valid keys
+            if key in self.path_mapping:
+                if not os.path.isdir(path):
+                    logger.error("path " + path + ", as specified in processingchain_defaults.yaml, does not exist in the virtual machine! Please create it first.")
+                    sys.exit(1)
+                if not os.access(path, os.W_OK):
+                    logger.error("path " + path + ", as specified in processingchain_defaults.yaml, does not have write permissions for current user!")
+                    sys.exit(1)
+                self.path_mapping[key] = path
+            else:
+                logger.warn(key + " is not a valid path identifier, ignoring")
 
-        for key, path in self.path_mapping.items():
-            if not os.path.isdir(path):
-                logger.warn("path " + path + " does not exist; creating empty folder")
+        for path in self.path_mapping.values():
+            try:
                 os.makedirs(path)
+            except FileExistsError:
+                continue
+            logger.warn("path " + path + " did not exist; created empty folder")
 
-        logger.debug(pprint.pformat(self.path_mapping))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(pprint.pformat(self.path_mapping))
 
     def _create_required_segments(self):
         """
@@ -1064,17 +1200,22 @@ class TestConfig:
         self.segments = set()
 
         for pvs_id, pvs in self.pvses.items():
+            src = pvs.src
+            hrc = pvs.hrc
+            segment_duration = hrc.segment_duration
+
             # get the SRC length so we can make sure that we don't exceed it with the last segment
-            if not pvs.src.is_youtube:
-                if pvs.hrc.event_list[0].duration != "src_duration":
-                    src_length = float(pvs.src.get_duration())
-                    total_event_duration = sum(event.duration for event in pvs.hrc.event_list if event.event_type == "quality_level")
+            if not src.is_youtube:
+                if hrc.event_list[0].duration != "src_duration":
+                    src_length = float(src.get_duration())
+                    total_event_duration = hrc.total_quality_event_duration
                     if src_length < total_event_duration:
-                        logger.warning("{pvs.src} has a length of only {src_length}, but events in {pvs} sum up to {total_event_duration}. Last event(s) will be cut.".format(**locals()))
+                        logger.warning("{src} has a length of only {src_length}, but events in {pvs} sum up to {total_event_duration}. Last event(s) will be cut.".format(
+                            src=src, src_length=src_length, pvs=pvs, total_event_duration=total_event_duration))
                     elif src_length > total_event_duration:
-                        logger.warning("{pvs.src} is longer than the events specified in {pvs}; trimming will occur.".format(**locals()))
+                        logger.warning("{src} is longer than the events specified in {pvs}; trimming will occur.".format(src=src, pvs=pvs))
                 else:
-                    logger.debug("Skipping calculation of event duration for " + str(pvs) + ", since it's set to SRC duration")
+                    logger.debug("Skipping calculation of event duration for %s, since it's set to SRC duration", pvs)
             else:
                 logger.warning("Cannot check duration of YouTube videos yet, make sure your events in " + str(pvs) + " sum up to the right duration.")
 
@@ -1082,45 +1223,43 @@ class TestConfig:
             segment_index = 0
 
             # go through all events for this HRC
-            for event in pvs.hrc.event_list:
+            for event in hrc.event_list:
                 # only handle non-YouTube and non-stall
                 if event.event_type == "quality_level":
                     # special case where event duration is "src_duration"
                     if event.duration == "src_duration":
                         number_of_segments = 1
                     else:
-                        # check that the event is divisible by segment duration
-                        if (event.duration % pvs.hrc.segment_duration != 0):
+                        # check how many segments we need, and that the event is divisible by segment duration
+                        number_of_segments, remainder = divmod(event.duration, segment_duration)
+                        if remainder != 0:
                             logger.error("event duration " + str(event.duration) +
-                                         " does not match with segment duration of " + str(pvs.hrc.segment_duration) +
-                                         ", please fix this event in " + pvs.hrc.hrc_id)
+                                         " does not match with segment duration of " + str(segment_duration) +
+                                         ", please fix this event in " + hrc.hrc_id)
                             sys.exit(1)
 
-                        # check how many segments we need and create them
-                        number_of_segments = event.duration / pvs.hrc.segment_duration
-
                     if self.type == "short" and number_of_segments > 1:
-                        logger.error("Short databases only allow one segment, HRC " + str(pvs.hrc) + " does not comply.")
+                        logger.error("Short databases only allow one segment, HRC " + str(hrc) + " does not comply.")
                         sys.exit(1)
 
                     # create the individual segments
-                    for i in range(int(number_of_segments)):
+                    for i in range(number_of_segments):
 
                         # normal case
-                        if pvs.hrc.segment_duration != "src_duration":
+                        if segment_duration != "src_duration":
                             # normally, the segment length is the default segment length
-                            required_segment_duration = pvs.hrc.segment_duration
+                            required_segment_duration = segment_duration
 
                             # ... unless we would exceed the end of the SRC, in which case
                             # we have to cut the segment.
-                            if not pvs.src.is_youtube:
+                            if not src.is_youtube:
                                 if current_timestamp + required_segment_duration > src_length:
                                     required_segment_duration = src_length - current_timestamp
                         # segment duration should be the (only) event duration == SRC duration
                         else:
                             # required_segment_duration = event.duration
-                            logger.debug("Setting segment duration in PVS " + str(pvs) + " to SRC duration")
-                            required_segment_duration = pvs.src.get_duration()
+                            logger.debug("Setting segment duration in PVS %s to SRC duration", pvs)
+                            required_segment_duration = src.get_duration()
 
                         if required_segment_duration <= 0:
                             logger.warning("Got a segment with duration less or equal 0 in PVS {}, skipping".format(pvs))
@@ -1128,29 +1267,33 @@ class TestConfig:
 
                         segment = Segment(
                             index=segment_index,
-                            src=pvs.src,
+                            src=src,
                             quality_level=event.quality_level,
-                            video_coding=pvs.hrc.video_coding,
-                            audio_coding=pvs.hrc.audio_coding,
+                            video_coding=hrc.video_coding,
+                            audio_coding=hrc.audio_coding,
                             start_time=current_timestamp,
                             duration=required_segment_duration
                         )
                         current_timestamp += required_segment_duration
                         segment_index += 1
-                        logger.debug("adding segment " + str(segment))
+                        logger.debug("adding segment %s", segment)
 
                         # add the references to this segment to various containers
                         pvs.segments.append(segment)
-                        pvs.src.segments.add(segment)
-                        pvs.hrc.segments.add(segment)
+                        src.segments.add(segment)
+                        hrc.segments.add(segment)
                         self.segments.add(segment)
 
     def _parse_complexity(self):
-        df_c = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'util', 'complexityAnalysis', 'complexity_classification.csv'), sep=",")
-
-        df_c_val = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'util', 'complexityAnalysis', 'complexity_classification_validation.csv'), sep=",")
+        # pandas is slow to import and only needed here
+        import pandas as pd
 
-        complexity_dict = {**pd.Series(df_c.complexity_class.values, index=df_c.file).to_dict(), **pd.Series(df_c_val.complexity_class.values, index=df_c_val.file).to_dict()}
+        complexity_dict = {}
+        # entries in the validation set take precedence
+        for csv_file in ['complexity_classification.csv', 'complexity_classification_validation.csv']:
+            df = pd.read_csv(os.path.join(os.path.dirname(__file__), '..', 'util', 'complexityAnalysis', csv_file),
+                             sep=",", usecols=['file', 'complexity_class'])
+            complexity_dict.update(zip(df['file'], df['complexity_class']))
 
         self.complexity_dict = complexity_dict
 
@@ -1161,14 +1304,15 @@ class TestConfig:
         self.database_id = self.data['databaseId']
 
         # check YAML syntax version
-        if 'syntaxVersion' in self.data.keys():
-            if self.data['syntaxVersion'] < self.REQUIRED_YAML_SYNTAX_VERSION:
+        syntax_version = self.data.get('syntaxVersion')
+        if syntax_version is not None:
+            if syntax_version < self.REQUIRED_YAML_SYNTAX_VERSION:
                 logger.error("Your YAML file syntax may be outdated, as the syntax has changed in the meantime. Please check if your YAML file is compatible with the syntax given in https://gitlab.com/pnats2avhd/processing-chain/wikis/home and change the 'syntaxVersion' number to " + str(self.REQUIRED_YAML_SYNTAX_VERSION))
                 sys.exit(1)
         else:
             logger.warn("YAML file does not specify the 'syntaxVersion', things might break!")
 
-        if not re.match(self.REGEX_DATABASE_ID, self.database_id):
+        if not self.PATTERN_DATABASE_ID.match(self.database_id):
             logger.error("Database ID " + self.database_id + " does not have correct ID syntax: " + self.REGEX_DATABASE_ID)
             sys.exit(1)
         if self.yaml_basename != self.database_id:
@@ -1182,15 +1326,12 @@ class TestConfig:
             sys.exit(1)
 
         # parse default segment duration, if any
-        if 'segmentDuration' in self.data.keys():
-            self.default_segment_duration = self.data['segmentDuration']
-        else:
-            # if none exists for long tests, this is an error
-            if self.type == 'long':
-                logger.error("A default segment duration must be defined for long tests using the 'segmentDuration' key. You can override this in every HRC.")
-                sys.exit(1)
-            # else, for short tests, there doesn't have to be default
-            self.default_segment_duration = None
+        self.default_segment_duration = self.data.get('segmentDuration')
+        # if none exists for long tests, this is an error;
+        # for short tests, there doesn't have to be default
+        if self.default_segment_duration is None and self.type == 'long':
+            logger.error("A default segment duration must be defined for long tests using the 'segmentDuration' key. You can override this in every HRC.")
+            sys.exit(1)
 
         self.quality_levels = {}
         self.codings = {}
@@ -1202,42 +1343,42 @@ class TestConfig:
         self.post_processings = []
 
         for ql_id, data in self.data['qualityLevelList'].items():
-            if not re.match(self.REGEX_QL_ID, ql_id):
+            if not self.PATTERN_QL_ID.match(ql_id):
                 logger.error("Quality Level ID " + ql_id + " does not have correct syntax: " + self.REGEX_QL_ID)
                 sys.exit(1)
             ql = QualityLevel(ql_id, self, data)
             self.quality_levels[ql_id] = ql
 
         for coding_id, data in self.data['codingList'].items():
-            if not re.match(self.REGEX_CODING_ID, coding_id):
+            if not self.PATTERN_CODING_ID.match(coding_id):
                 logger.error("Coding ID " + coding_id + " does not have correct syntax: " + self.REGEX_CODING_ID)
                 sys.exit(1)
             self.codings[coding_id] = Coding(coding_id, self, data)
             self.codings['youtube'] = YoutubeCoding('youtube', self)  # dummy coding
 
         for src_id, data in self.data['srcList'].items():
-            if not re.match(self.REGEX_SRC_ID, src_id):
-                logger.error("SRC ID " + src_id + " does not have correct syntax: " + self.REGEX_SRC_ID)
-                sys.exit(1)
-
             if self.filter_srcs and src_id not in self.filter_srcs:
                 # skip this source
                 logger.info("skipping SRC " + src_id)
                 continue
 
+            if not self.PATTERN_SRC_ID.match(src_id):
+                logger.error("SRC ID " + src_id + " does not have correct syntax: " + self.REGEX_SRC_ID)
+                sys.exit(1)
+
             src = Src(src_id, self, data)
             self.srcs[src_id] = src
 
         for hrc_id, data in self.data['hrcList'].items():
-            if not re.match(self.REGEX_HRC_ID, hrc_id):
-                logger.error("HRC ID " + hrc_id + " does not have correct syntax: " + self.REGEX_HRC_ID)
-                sys.exit(1)
-
             if self.filter_hrcs and hrc_id not in self.filter_hrcs:
                 # skip this HRC
                 logger.info("skipping HRC " + hrc_id)
                 continue
 
+            if not self.PATTERN_HRC_ID.match(hrc_id):
+                logger.error("HRC ID " + hrc_id + " does not have correct syntax: " + self.REGEX_HRC_ID)
+                sys.exit(1)
+
             video_coding = self.codings[data['videoCodingId']]
             if self.type == "long":
                 audio_coding = self.codings[data['audioCodingId']]
@@ -1247,11 +1388,9 @@ class TestConfig:
             event_list = []  # list of events for this HRC
 
             # allow overriding segment duration per HRC
-            if 'segmentDuration' in data.keys():
-                if 'src_duration' in [e[1] for e in data['eventList']]:
-                    logger.error("You cannot specify both segmentDuration and src_duration as event length in HRC " + hrc_id + "!")
-                    sys.exit(1)
-                hrc_segment_duration = data['segmentDuration']
+            hrc_segment_duration_override = data.get('segmentDuration')
+            if hrc_segment_duration_override is not None:
+                hrc_segment_duration = hrc_segment_duration_override
             else:
                 # if not, it could still be "None" ...
                 hrc_segment_duration = self.default_segment_duration
@@ -1283,6 +1422,9 @@ class TestConfig:
                 # event duration can be either a number or "src_duration"
                 event_duration = event_data[1]
                 if event_duration == "src_duration":
+                    if hrc_segment_duration_override is not None:
+                        logger.error("You cannot specify both segmentDuration and src_duration as event length in HRC " + hrc_id + "!")
+                        sys.exit(1)
                     hrc_segment_duration = "src_duration"
                 event = Event(event_type, quality_level, event_duration)
                 event_list.append(event)
@@ -1295,25 +1437,26 @@ class TestConfig:
                 e.hrc = hrc
 
             # re-associate the quality levels with the HRC and vice-versa
-            for q in set(quality_level_list):
+            for q in quality_level_list:
                 hrc.quality_levels.add(q)
-            for q in set([q for q in quality_level_list if isinstance(q, QualityLevel)]):
-                q.hrcs.add(hrc)
+                if isinstance(q, QualityLevel):
+                    q.hrcs.add(hrc)
 
             self.hrcs[hrc_id] = hrc
 
         for pvs_id in self.data['pvsList']:
-            if not re.match(self.REGEX_PVS_ID, pvs_id):
-                logger.error("PVS ID " + pvs_id + " does not have correct syntax: " + self.REGEX_PVS_ID)
-                sys.exit(1)
-
             if self.filter_pvses and pvs_id not in self.filter_pvses:
                 # skip this PVS
                 logger.info("skipping PVS " + pvs_id)
                 continue
 
-            src_id = re.findall(r'SRC\d+', pvs_id)[0]
-            hrc_id = re.findall(r'HRC\d+', pvs_id)[0]
+            pvs_id_match = self.PATTERN_PVS_ID.match(pvs_id)
+            if not pvs_id_match:
+                logger.error("PVS ID " + pvs_id + " does not have correct syntax: " + self.REGEX_PVS_ID)
+                sys.exit(1)
+
+            # SRC and HRC ID are captured by REGEX_PVS_ID
+            src_id, hrc_id = pvs_id_match.group(3, 4)
 
             skip_pvs = False
             if self.filter_srcs and src_id not in self.filter_srcs:
@@ -1327,10 +1470,10 @@ class TestConfig:
                 continue
 
             # assign PVS with SRC and HRC
-            if src_id not in self.srcs.keys():
+            if src_id not in self.srcs:
                 logger.error("PVS " + pvs_id + " specifies SRC " + src_id + " but it is not defined in the srcList")
                 sys.exit(1)
-            if hrc_id not in self.hrcs.keys():
+            if hrc_id not in self.hrcs:
                 logger.error("PVS " + pvs_id + " specifies HRC " + hrc_id + " but it is not defined in the hrcList")
                 sys.exit(1)
             src = self.srcs[src_id]
@@ -1348,8 +1491,8 @@ class TestConfig:
         for data in self.data['postProcessingList']:
             post_processing = PostProcessing(self, data)
             self.post_processings.append(post_processing)
-            if len(self.post_processings) > 1:
-                logger.warning("More than one post processing is not really supported!")
+        if len(self.post_processings) > 1:
+            logger.warning("More than one post processing is not really supported!")
 
     def __repr__(self):
         return self.data.__repr__()
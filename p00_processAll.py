@@ -30,16 +30,19 @@ def run(cli_args):
 
     if "1" in cli_args.scripts_to_run or cli_args.scripts_to_run == 'all':
         print("Running script 1")
-        print(parse_args.parse_args(name="p01_generateSegments", script=1))
-        test_config = p01.run(cli_args=parse_args.parse_args(name="p01_generateSegments", script=1))
+        p01_args = parse_args.parse_args(name="p01_generateSegments", script=1)
+        print(p01_args)
+        test_config = p01.run(cli_args=p01_args)
     if "2" in cli_args.scripts_to_run or cli_args.scripts_to_run == 'all':
         print("Running script 2")
-        print(parse_args.parse_args(name="p02_generateMetadata", script=2))
-        test_config = p02.run(cli_args=parse_args.parse_args(name="p02_generateMetadata", script=2), test_config=test_config)
+        p02_args = parse_args.parse_args(name="p02_generateMetadata", script=2)
+        print(p02_args)
+        test_config = p02.run(cli_args=p02_args, test_config=test_config)
     if "3" in cli_args.scripts_to_run or cli_args.scripts_to_run == 'all':
         print("Running script 3")
-        print(parse_args.parse_args(name="p03_generateAvPvs", script=3))
-        test_config = p03.run(cli_args=parse_args.parse_args(name="p03_generateAvPvs", script=3), test_config=test_config)
+        p03_args = parse_args.parse_args(name="p03_generateAvPvs", script=3)
+        print(p03_args)
+        test_config = p03.run(cli_args=p03_args, test_config=test_config)
     if "4" in cli_args.scripts_to_run or cli_args.scripts_to_run == 'all':
         print("Running script 4")
         p04.run(cli_args=parse_args.parse_args(name="p04_generateCpvs", script=4), test_config=test_config)
@@ -17,6 +17,8 @@
 
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
 import lib.test_config as cfg
 import lib.parse_args as parse_args
 import lib.log as log
@@ -27,6 +29,11 @@ import lib.check_requirements as check_requirements
 logger = log.setup_custom_logger('main')
 
 
+def write_logfile(logfile, content):
+    with open(logfile, "w") as lf:
+        lf.write(content)
+
+
 def run(cli_args):
     test_config = cfg.TestConfig(cli_args.test_config, cli_args.filter_src, cli_args.filter_hrc, cli_args.filter_pvs)
 
@@ -46,6 +53,17 @@ def run(cli_args):
 
     cmd_runner = cmd_utils.ParallelRunner(cli_args.parallelism)
 
+    # absolute paths to remove from the logged commands
+    path_stripper = cmd_utils.compile_path_stripper([
+        test_config.get_video_segments_path() + "/",
+        check_requirements.get_processing_chain_dir() + "/logs/",
+        test_config.get_src_vid_path() + "/"
+    ])
+
+    # logfiles are collected and written together once all commands are known
+    logfiles = []
+    processing_chain_version = check_requirements.get_processing_chain_version()
+
     for seg in required_segments:
         if seg.video_coding.is_online:
             if not cli_args.skip_online_services:
@@ -71,21 +89,27 @@ def run(cli_args):
                 logfile = seg.get_logfile_path()
 
                 # replace all absolute paths
-                seg_cmd = cmd.replace(test_config.get_video_segments_path() + "/", "")
-                seg_cmd = seg_cmd.replace(check_requirements.get_processing_chain_dir() + "/logs/", "")
-                seg_cmd = seg_cmd.replace(test_config.get_src_vid_path() + "/", "")
+                seg_cmd = path_stripper.sub("", cmd)
 
                 logger.debug("writing segment logfile to " + logfile)
-                if not cli_args.dry_run:
-                    with open(logfile, "w") as lf:
-                        lf.write("segmentFilename: " + seg.get_filename() + "\n")
-                        lf.write("processingChain: " + check_requirements.get_processing_chain_version() + "\n")
-                        lf.write("ffmpegCommand: " + seg_cmd + "\n")
+                logfiles.append((
+                    logfile,
+                    "segmentFilename: " + seg.get_filename() + "\n" +
+                    "processingChain: " + processing_chain_version + "\n" +
+                    "ffmpegCommand: " + seg_cmd + "\n"
+                ))
 
     if cli_args.dry_run:
         cmd_runner.log_commands()
         return test_config
 
+    # the files are small, so overlap the open/write/close calls instead of waiting on each
+    with ThreadPoolExecutor(max_workers=cli_args.parallelism) as executor:
+        futures = [executor.submit(write_logfile, logfile, content) for logfile, content in logfiles]
+        # re-raise any error from writing a logfile
+        for future in futures:
+            future.result()
+
     logger.info("starting to process segments, please wait")
     cmd_runner.run_commands()
 
@@ -17,7 +17,9 @@
 
 import os
 import sys
+import csv
 import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 import lib.test_config as cfg
 import lib.parse_args as parse_args
@@ -25,21 +27,109 @@ import lib.log as log
 import lib.check_requirements as check_requirements
 import lib.get_framesize as get_framesize
 
-import pandas as pd
-
 logger = log.setup_custom_logger('main')
 
+# exact frame size parser per (lowercase) codec name
+FRAMESIZE_PARSERS = {
+    "h264": get_framesize.get_framesize_h264,
+    "hevc": get_framesize.get_framesize_h265,
+    "h265": get_framesize.get_framesize_h265,
+    "vp9": get_framesize.get_framesize_vp9,
+}
+
+# CSV columns of the output files, in the order the ffmpeg probe functions create the keys
+QCHANGES_COLUMNS = (
+    "segment_filename", "file_size",
+    "video_duration", "video_frame_rate", "video_bitrate", "video_target_bitrate",
+    "video_width", "video_height", "video_codec", "video_profile",
+    "audio_duration", "audio_sample_rate", "audio_codec", "audio_bitrate",
+)
+VFI_COLUMNS = ("segment", "index", "frame_type", "dts", "size", "duration")
+AFI_COLUMNS = ("segment", "index", "dts", "size", "duration")
+
+
+def write_csv(file_path, rows, columns):
+    """
+    Write a list of dicts to a CSV file, with those of the given columns that occur in the rows
+    """
+    # e.g. the audio columns are left out when no segment has audio
+    fieldnames = [c for c in columns if any(c in row for row in rows)]
+    with open(file_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def get_segment_framesizes(segment_file, segment_codec, force):
+    """
+    Return the exact frame sizes of a segment, using the parser for its codec
+    """
+    parser = FRAMESIZE_PARSERS.get(segment_codec)
+    if parser is None:
+        logger.error("Invalid codec")
+        sys.exit(1)
+    return parser(segment_file, force)
+
+
+def get_output_files(test_config, pvs):
+    """
+    Return the paths of all metadata files written for a PVS
+    """
+    output_files = {
+        "qchanges": os.path.join(test_config.get_quality_change_event_files_path(), pvs.pvs_id + '.qchanges'),
+        "vfi": os.path.join(test_config.get_video_frame_information_path(), pvs.pvs_id + '.vfi'),
+        "afi": os.path.join(test_config.get_audio_frame_information_path(), pvs.pvs_id + '.afi'),
+    }
+    if pvs.has_buffering():
+        output_files["buff"] = os.path.join(test_config.get_buff_event_files_path(), pvs.pvs_id + '.buff')
+    return output_files
+
 
 def run(cli_args, test_config=None):
     if not test_config:
         test_config = cfg.TestConfig(cli_args.test_config, cli_args.filter_src, cli_args.filter_hrc,
                                      cli_args.filter_pvs)
 
-    for pvs_id, pvs in test_config.pvses.items():
+    # list the segments folder once instead of checking every segment file on its own
+    # (the scandir iterator is a context manager only from Python 3.6, so consume it directly)
+    existing_segments = {entry.name for entry in os.scandir(test_config.get_video_segments_path()) if entry.is_file()}
 
+    # get all pvs to be processed; without --force, PVSes whose metadata
+    # is complete are skipped before any segment is probed
+    pvs_to_process = []
+    for pvs in test_config.pvses.values():
         if cli_args.skip_online_services and pvs.is_online():
             logger.warning("Skipping PVS {} because it is an online service".format(pvs))
             continue
+        if not cli_args.force and all(os.path.isfile(f) for f in get_output_files(test_config, pvs).values()):
+            logger.warning("all metadata files for PVS {} already exist, not overwriting. "
+                           "Use -f/--force to force overwriting".format(pvs))
+            continue
+        pvs_to_process.append(pvs)
+
+    # probe all required segments up front; ffprobe runs in a subprocess,
+    # so threads are enough to run several of them at once
+    required_segments = set()
+    for pvs in pvs_to_process:
+        required_segments.update(segment for segment in pvs.segments if segment.get_filename() in existing_segments)
+    with ThreadPoolExecutor(max_workers=cli_args.parallelism) as executor:
+        list(executor.map(lambda segment: segment.load_probe_info(), required_segments))
+
+    # get frame sizes once per segment; parsing the bitstreams is pure Python,
+    # so use processes. This is not done per PVS, since PVSes share segments
+    # and the parsers write and remove temporary files next to them.
+    required_segments = sorted(required_segments)
+    with ProcessPoolExecutor(max_workers=cli_args.parallelism) as executor:
+        framesizes = executor.map(
+            get_segment_framesizes,
+            [segment.get_segment_file_path() for segment in required_segments],
+            [segment.get_segment_info()["video_codec"].lower() for segment in required_segments],
+            [cli_args.force] * len(required_segments)
+        )
+        segment_framesizes_by_segment = dict(zip(required_segments, framesizes))
+
+    for pvs in pvs_to_process:
+        output_files = get_output_files(test_config, pvs)
 
         # ---------------------------------------------------------
         # get qchanges info
@@ -47,19 +137,19 @@ def run(cli_args, test_config=None):
         pvs_qchanges = []
 
         for segment in pvs.segments:
-            if not segment.exists():
+            if segment.get_filename() not in existing_segments:
                 logger.error("segment " + segment.get_filename() + " does not exist!")
                 sys.exit(1)
-            pvs_qchanges.append(segment.get_segment_info())
+            # copy, since the video bitrate is adjusted below and the segment may be shared by other PVSes
+            pvs_qchanges.append(dict(segment.get_segment_info()))
 
-        qchanges_file = os.path.join(test_config.get_quality_change_event_files_path(), pvs_id + '.qchanges')
+        qchanges_file = output_files["qchanges"]
 
         # ---------------------------------------------------------
         # write .buff file for PVS
         if pvs.has_buffering():
             buff_events = pvs.get_buff_events_media_time()
-            buff_path = test_config.get_buff_event_files_path()
-            buff_file = os.path.join(buff_path, pvs_id + '.buff')
+            buff_file = output_files["buff"]
 
             if not cli_args.force and os.path.isfile(buff_file):
                 logger.warn(
@@ -75,11 +165,11 @@ def run(cli_args, test_config=None):
         pvs_vfi = []
         pvs_afi = []
 
+        # all segments were checked to exist above
         for segment in pvs.segments:
-            if not segment.exists():
-                logger.error("segment " + segment.get_filename() + " does not exist!")
-                sys.exit(1)
-            pvs_vfi.extend(segment.get_video_frame_info())
+            # copy the frames, since sizes and indices are rewritten below and
+            # the segment's frame info may be shared with other PVSes
+            pvs_vfi.extend(dict(frame) for frame in segment.get_video_frame_info())
             pvs_afi.extend(segment.get_audio_frame_info())
 
         # ---------------------------------------------------------
@@ -87,37 +177,24 @@ def run(cli_args, test_config=None):
         cleaned_framesizes = []
         cleaned_segments = 0
         for segment in pvs.segments:
-            # print(segment)
-            cleaned_segment_size = 0
-            segment_codec = segment.get_segment_info()["video_codec"].lower()
-            get_framesize_args = (os.path.join(test_config.get_video_segments_path(), segment.get_filename()), cli_args.force)
-            if segment_codec == "h264":
-                segment_framesizes = get_framesize.get_framesize_h264(*get_framesize_args)
-                cleaned_framesizes.extend(segment_framesizes)
-            elif segment_codec in ["hevc", "h265"]:
-                segment_framesizes = get_framesize.get_framesize_h265(*get_framesize_args)
-                cleaned_framesizes.extend(segment_framesizes)
-            elif segment_codec == "vp9":
+            segment_codec = pvs_qchanges[cleaned_segments]["video_codec"].lower()
+            if segment_codec == "vp9":
                 # delete extraneous packets
                 get_framesize.delete_packets(pvs_vfi)
-                segment_framesizes = get_framesize.get_framesize_vp9(*get_framesize_args)
-                cleaned_framesizes.extend(segment_framesizes)
-            else:
-                logger.error("Invalid codec")
-                sys.exit(1)
+            segment_framesizes = segment_framesizes_by_segment[segment]
+            cleaned_framesizes.extend(segment_framesizes)
             # get segment size for .qchanges file
-            for cur_framesize in segment_framesizes:
-                cleaned_segment_size += cur_framesize
+            cleaned_segment_size = sum(segment_framesizes)
             pvs_qchanges[cleaned_segments]["video_bitrate"] = round(cleaned_segment_size/1024*8/pvs_qchanges[cleaned_segments]["video_duration"], 2)
             cleaned_segments += 1
 
         # ---------------------------------------------------------
         # replace ffprobe framesizes with computed framesizes for vfi file
         if len(pvs_vfi) != len(cleaned_framesizes):
-            logger.error("Number of frames detected for " + segment.get_filename() + " does not match!".format(**locals()))
+            logger.error("Number of frames detected for " + segment.get_filename() + " does not match!")
             sys.exit(1)
-        for i in range(len(cleaned_framesizes)):
-            pvs_vfi[i]["size"] = cleaned_framesizes[i]
+        for frame, framesize in zip(pvs_vfi, cleaned_framesizes):
+            frame["size"] = framesize
 
         # ---------------------------------------------------------
         # write out .qchanges with adjusted videobitrate
@@ -126,24 +203,24 @@ def run(cli_args, test_config=None):
                 "file " + qchanges_file + " already exists, not overwriting. Use -f/--force to force overwriting")
         else:
             logger.info("writing .qchanges to " + qchanges_file)
-            pd.DataFrame(pvs_qchanges).to_csv(qchanges_file, index=False)
+            write_csv(qchanges_file, pvs_qchanges, QCHANGES_COLUMNS)
 
         # ---------------------------------------------------------
         # write out data
-        vfi_file = os.path.join(test_config.get_video_frame_information_path(), pvs_id + '.vfi')
-        afi_file = os.path.join(test_config.get_audio_frame_information_path(), pvs_id + '.afi')
+        vfi_file = output_files["vfi"]
+        afi_file = output_files["afi"]
 
         if not cli_args.force and os.path.isfile(vfi_file):
             logger.warn("file " + vfi_file + " already exists, not overwriting. Use -f/--force to force overwriting")
         else:
             logger.info("writing VFI to " + vfi_file)
-            pd.DataFrame(pvs_vfi).to_csv(vfi_file, index=False)
+            write_csv(vfi_file, pvs_vfi, VFI_COLUMNS)
 
         if not cli_args.force and os.path.isfile(afi_file):
             logger.warn("file " + afi_file + " already exists, not overwriting. Use -f/--force to force overwriting")
         else:
             logger.info("writing AFI to " + afi_file)
-            pd.DataFrame(pvs_afi).to_csv(afi_file, index=False)
+            write_csv(afi_file, pvs_afi, AFI_COLUMNS)
 
     return test_config
 
@@ -18,6 +18,7 @@
 import os
 import sys
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import lib.test_config as cfg
 import lib.parse_args as parse_args
@@ -30,12 +31,21 @@ logger = log.setup_custom_logger('main')
 
 
 def flatten(input_list):
-    for x in input_list:
-        if hasattr(x, '__iter__') and not isinstance(x, str):
-            for y in flatten(x):
-                yield y
-        else:
-            yield x
+    """
+    Flatten a list of commands and lists of commands (one level deep)
+    """
+    return (y for x in input_list for y in (x if isinstance(x, (list, tuple)) else [x]))
+
+
+def remove_files(file_paths, parallelism):
+    """
+    Remove files in parallel; unlinking large lossless videos can take a while
+    """
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        futures = [executor.submit(os.remove, file_path) for file_path in file_paths]
+        # re-raise any error from removing a file
+        for future in futures:
+            future.result()
 
 
 def write_to_p03_logfile(pvs, cmd_list):
@@ -44,14 +54,19 @@ def write_to_p03_logfile(pvs, cmd_list):
 
     cmd_list = flatten(cmd_list)
 
+    # absolute paths to remove from the logged commands
+    path_stripper = cmd_utils.compile_path_stripper([
+        pvs.test_config.get_video_segments_path() + "/",
+        check_requirements.get_processing_chain_dir() + "/logs/",
+        pvs.test_config.get_src_vid_path() + "/"
+    ])
+
     with open(logfile, "w") as lf:
         lf.write("segmentFilename: " + pvs.pvs_id + "\n")
         lf.write("processingChain: " + check_requirements.get_processing_chain_version() + "\n")
         for cmd in cmd_list:
             if cmd is not None:
-                seg_cmd = cmd.replace(pvs.test_config.get_video_segments_path() + "/", "")
-                seg_cmd = seg_cmd.replace(check_requirements.get_processing_chain_dir() + "/logs/", "")
-                seg_cmd = seg_cmd.replace(pvs.test_config.get_src_vid_path() + "/", "")
+                seg_cmd = path_stripper.sub("", cmd)
                 lf.write("ffmpegCommand: " + seg_cmd + "\n")
 
 
@@ -77,6 +92,9 @@ def run(cli_args, test_config=None):
 
         pvs_commands = {}
 
+        # segments are decoded in parallel, so split the available cores among the ffmpeg jobs
+        threads_per_segment = max(1, min(4, (os.cpu_count() or 1) // cli_args.parallelism))
+
         for pvs in pvs_to_complete:
             pvs_commands[pvs.pvs_id] = []
             # decode segments
@@ -88,7 +106,8 @@ def run(cli_args, test_config=None):
                     seg,
                     pvs,
                     overwrite=cli_args.force,
-                    scale_avpvs_tosource=cli_args.avpvs_src_fps)
+                    scale_avpvs_tosource=cli_args.avpvs_src_fps,
+                    threads=threads_per_segment)
                 cmd_name = "create AVPVS segment nr: " + str(segment_iter) + " for " + str(pvs)
                 cmd_runner_segments.add_cmd(
                     cmd,
@@ -98,25 +117,15 @@ def run(cli_args, test_config=None):
 
             pvs_commands[pvs.pvs_id].append(cmd_runner_segments.return_command_list())
 
-            # concatenate segments
+            # concatenate segments and add audio
             cmd_concat = ffmpeg.create_avpvs_long_concat(
                 pvs,
-                overwrite=cli_args.force,
-                scale_avpvs_tosource=cli_args.avpvs_src_fps)
-            cmd_concat_name = "create AVPVS long for " + str(pvs)
+                overwrite=cli_args.force)
+            cmd_concat_name = "create AVPVS long with audio for " + str(pvs)
             pvs_commands[pvs.pvs_id].append(cmd_concat)
 
-            # add audio
-            cmd_audio = ffmpeg.audio_mux(
-                pvs,
-                overwrite=cli_args.force
-                )
-            cmd_audio_name = "Muxing audio and video for " + str(pvs)
-            pvs_commands[pvs.pvs_id].append(cmd_audio)
-
             # run or log all commands
             logger.debug(cmd_concat)
-            logger.debug(cmd_audio)
             if cli_args.dry_run:
                 cmd_runner_segments.log_commands()
             else:
@@ -125,18 +134,11 @@ def run(cli_args, test_config=None):
                     cmd_concat,
                     name=str(cmd_concat_name)
                     )
-                cmd_utils.run_command(
-                    cmd_audio,
-                    name=str(cmd_audio_name)
-                    )
 
             # delete avpvs segments
             logger.info("Removing " + str(len(pvs.segments)) + " avpvs segments")
             if not cli_args.dry_run:
-                os.remove(pvs.get_avpvs_file_list())
-                os.remove(pvs.get_tmp_wo_audio_path())
-                for seg in pvs.segments:
-                    os.remove(seg.get_tmp_path())
+                remove_files([seg.get_tmp_path() for seg in pvs.segments], cli_args.parallelism)
 
         # add stalling if needed
         pvs_with_buffering = [pvs for pvs in pvs_to_complete if pvs.has_buffering()]
@@ -177,8 +179,7 @@ def run(cli_args, test_config=None):
 
         if cli_args.remove_intermediate:
             logger.info("removing " + str(len(pvs_with_buffering)) + " intermediate video files")
-            for pvs_name in pvs_with_buffering:
-                os.remove(pvs.get_avpvs_wo_buffer_file_path())
+            remove_files([pvs.get_avpvs_wo_buffer_file_path() for pvs in pvs_with_buffering], cli_args.parallelism)
 
     # Only run decoding if the test type is "short", only one segment assumed
     else:
@@ -37,23 +37,17 @@ def run(cli_args, test_config=None):
 
     # get all pvs to be processed
     pvs_to_process = []
-    for pvs_id, pvs in test_config.pvses.items():
+    for pvs in test_config.pvses.values():
         if pvs.is_online() and cli_args.skip_online_services:
             continue
-        pvs_to_process.append(pvs_id)
+        pvs_to_process.append(pvs)
 
     logger.info("will re-convert " + str(len(pvs_to_process)) + " PVSes")
     if cli_args.lightweight_preview:
         logger.info("will create preview for " + str(len(pvs_to_process)) + " PVSes")
 
     # Collect all commands in one dict
-    for pvs_name in pvs_to_process:
-        pvs = test_config.pvses[pvs_name]
-
-        if cli_args.skip_online_services and pvs.is_online():
-            logger.warn("Skipping PVS {} because it is an online PVS".format(pvs))
-            continue
-
+    for pvs in pvs_to_process:
         for post_processing in test_config.post_processings:
             logger.info("processing for " + str(post_processing))
 
@@ -64,12 +58,12 @@ def run(cli_args, test_config=None):
                 rawvideo=cli_args.rawvideo,
                 overwrite=cli_args.force
             )
-            cmd_runner.add_cmd(cmd, name=str(pvs_name))
+            cmd_runner.add_cmd(cmd, name=str(pvs.pvs_id))
 
             # create preview if requirested
             if cli_args.lightweight_preview:
                 cmd = ffmpeg.create_preview(pvs, overwrite=cli_args.force)
-                cmd_runner.add_cmd(cmd, name=str(pvs_name) + ' preview')
+                cmd_runner.add_cmd(cmd, name=str(pvs.pvs_id) + ' preview')
 
     # Print cli text for all commands in the command-list and quit without producing any files
     if cli_args.dry_run:
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+#
+# This file is part of the AVHD-AS / P.NATS Phase 2 Processing Chain
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Tests for parsing test configurations with lib.test_config.
+
+Run from the processing chain folder with:
+
+> python3 -m unittest discover test
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import yaml
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import lib.test_config as cfg
+
+DATABASE_ID = "P2LXM99"
+YOUTUBE_SRC_FILE = "SRC101_youtube.mp4"
+
+# a long test with a single YouTube HRC, which has no encoder in its video coding
+YOUTUBE_CONFIG = {
+    "databaseId": DATABASE_ID,
+    "syntaxVersion": cfg.TestConfig.REQUIRED_YAML_SYNTAX_VERSION,
+    "type": "long",
+    "segmentDuration": 10,
+    "qualityLevelList": {
+        "Q0": {
+            "index": 0,
+            "videoCodec": "h264",
+            "videoBitrate": 1000,
+            "width": 1920,
+            "height": 1080,
+            "fps": "original",
+            "audioCodec": "aac",
+            "audioBitrate": 128,
+        },
+    },
+    "codingList": {
+        "AC1": {
+            "type": "audio",
+            "encoder": "aac",
+        },
+    },
+    "srcList": {
+        "SRC101": {
+            "srcFile": YOUTUBE_SRC_FILE,
+            "youtubeUrl": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        },
+    },
+    "hrcList": {
+        "HRC101": {
+            "videoCodingId": "youtube",
+            "audioCodingId": "AC1",
+            "eventList": [["137", 30]],
+        },
+    },
+    "pvsList": [
+        DATABASE_ID + "_SRC101_HRC101",
+    ],
+    "postProcessingList": [
+        {
+            "type": "pc",
+            "displayWidth": 1920,
+            "displayHeight": 1080,
+            "codingWidth": 1920,
+            "codingHeight": 1080,
+        },
+    ],
+}
+
+
+class TestYoutubeConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        database_dir = os.path.join(self.tmp_dir, DATABASE_ID)
+        src_vid_dir = os.path.join(database_dir, "srcVid")
+        os.makedirs(src_vid_dir)
+
+        self.yaml_file = os.path.join(database_dir, DATABASE_ID + ".yaml")
+        with open(self.yaml_file, "w") as f_out:
+            yaml.dump(YOUTUBE_CONFIG, f_out, default_flow_style=False)
+
+        # the SRC must exist, its stream info is read from the cached info file instead of ffprobe
+        src_file = os.path.join(src_vid_dir, YOUTUBE_SRC_FILE)
+        open(src_file, "w").close()
+        with open(src_file + ".yaml", "w") as f_out:
+            yaml.dump({"get_src_info": {"width": 1920, "height": 1080, "pix_fmt": "yuv420p"}}, f_out)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_youtube_hrc(self):
+        test_config = cfg.TestConfig(self.yaml_file)
+
+        hrc = test_config.hrcs["HRC101"]
+        self.assertEqual(hrc.hrc_type, "youtube")
+        self.assertIsInstance(hrc.video_coding, cfg.YoutubeCoding)
+        self.assertEqual([event.event_type for event in hrc.event_list], ["youtube"])
+
+        pvs = test_config.pvses[DATABASE_ID + "_SRC101_HRC101"]
+        self.assertEqual(pvs.segments, [])
+        # YouTube PVSes have no segments, so they are not skipped as online PVSes
+        self.assertFalse(pvs.is_online())
+
+
+if __name__ == '__main__':
+    unittest.main()
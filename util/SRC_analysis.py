@@ -19,24 +19,39 @@
 Create .info and .md5 files for each SRC video. If md5-file already exists, perform check. 
 """
 import hashlib
-import glob
 import io
 import os
 import sys
 import yaml
 sys.path.append('/processing-chain/')
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 import argparse
-from lib.ffmpeg import get_stream_size, get_segment_info, get_src_info
-
-
-def md5sum(src, ordernum, length=io.DEFAULT_BUFFER_SIZE):
-    md5 = hashlib.md5()
-
-    total = os.path.getsize(src)/length
-    with io.open(src, mode="rb") as fd:
-        for chunk in iter(lambda: fd.read(length), b''):
-            md5.update(chunk)
+from lib.ffmpeg import get_src_info_and_stream_sizes
+
+# use the libyaml-based dumper if PyYAML was built with it
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
+# extensions of the SRC video files picked up from input folders
+VIDEO_EXT = frozenset([".mp4", ".avi", ".mov", ".mkv", ".y4m"])
+
+
+def md5sum(src, ordernum, length=4 * 1024 * 1024):
+    try:
+        # only an integrity check, so FIPS-enabled OpenSSL builds may use MD5 too
+        md5 = hashlib.md5(usedforsecurity=False)
+    except TypeError:
+        # Python < 3.9
+        md5 = hashlib.md5()
+
+    # read large chunks into one reused buffer; hashlib releases the GIL for big updates
+    buf = bytearray(length)
+    view = memoryview(buf)
+    with io.open(src, mode="rb", buffering=0) as fd:
+        for n in iter(lambda: fd.readinto(buf), 0):
+            md5.update(view[:n])
     basename_src = os.path.basename(src)
     ordernum = str(ordernum).zfill(2)
     print("#{ordernum} is done, name: {basename_src}".format(**locals()))
@@ -88,7 +103,7 @@ def sum_file(videofile, ordernum):
     if os.path.isfile(md5sum_file):
         with open(md5sum_file, 'r') as f:
             # read MD5 sum directly or as given in the format of "md5sum" CLI call
-            md5sum_existing = f.readlines()[0].strip().split(" ")[0]
+            md5sum_existing = f.readline().split(None, 1)[0]
     md5sum_current = md5sum(videofile, ordernum)
 
     returntext = ''
@@ -104,37 +119,23 @@ def sum_file(videofile, ordernum):
     return(returntext)
 
 
-class Src:
-    def __init__(self, path):
-        self.file_path = path
-        self.info_path = False
-
-
-class Segment:
-    def __init__(self, path, src):
-        self.file_path = path
-        self.src = src
-        self.info_path = False
-
-
 def analyse_src(videofile, ordernum):
     returntext = {}
 
-    src = Src(videofile)
-    seg = Segment(videofile, src)
+    # run ffprobe while the MD5 sum is computed, it waits on a subprocess
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        probe_future = executor.submit(get_src_info_and_stream_sizes, videofile)
 
-    videoinfo = get_src_info(src)
-    videosize = get_stream_size(seg)
-    audiosize = get_stream_size(seg, 'audio')
+        md5filename = videofile + '.md5'
 
-    md5filename = videofile + '.md5'
+        if not os.path.isfile(md5filename):
+            calcmd5 = md5sum(videofile, ordernum)
+            md5hash = str(calcmd5.hexdigest())
+        else:
+            with open(md5filename, 'r') as f:
+                md5hash = f.readline().split(None, 1)[0]
 
-    if not os.path.isfile(md5filename):
-        calcmd5 = md5sum(videofile, ordernum)
-        md5hash = str(calcmd5.hexdigest())
-    else:
-        with open(md5filename, 'r') as f:
-            md5hash = f.readlines()[0].strip().split(" ")[0]
+        videoinfo, videosize, audiosize = probe_future.result()
 
     returntext['md5sum'] = md5hash
     returntext['get_stream_size'] = {"v": videosize, "a": audiosize}
@@ -142,7 +143,7 @@ def analyse_src(videofile, ordernum):
 
     yaml_path = videofile + '.yaml'
     with open(yaml_path, 'w') as outfile:
-        yaml.dump(returntext, outfile, default_flow_style=False)
+        yaml.dump(returntext, outfile, Dumper=YamlDumper, default_flow_style=False)
 
     return(yaml_path)
 
@@ -154,26 +155,50 @@ def dump_log(listofdata, output_name):
     outfile_h.close()
 
 
+def get_mtime_ns(path):
+    """Return the modification time of a file in ns, or None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def is_yaml_current(video_mtime_ns, yaml_mtime_ns):
+    """Return True if a .yaml file exists and is not older than its video"""
+    return yaml_mtime_ns is not None and yaml_mtime_ns >= video_mtime_ns
+
+
 def main():
     cli_args = parse_args("SRC analysis")
     videofiles = []
     for entry in cli_args.input:
         if os.path.isdir(entry):
-            video_ext = ["mp4", "avi", "mov", "mkv", "y4m"]
-            for extension in video_ext:
-                videofiles.extend(glob.glob(os.path.join(entry, "*." + extension)))
+            # list the folder once, this also gives the modification times of existing .yaml files
+            # (the scandir iterator is a context manager only from Python 3.6, so consume it directly)
+            mtimes = {
+                e.name: e.stat().st_mtime_ns
+                for e in os.scandir(entry) if not e.name.startswith('.') and e.is_file()
+            }
+            for file_name in sorted(mtimes):
+                if os.path.splitext(file_name)[1] not in VIDEO_EXT:
+                    continue
+                yaml_current = is_yaml_current(mtimes[file_name], mtimes.get(file_name + '.yaml'))
+                if not(cli_args.force_overwrite) and yaml_current:
+                    continue
+                videofiles.append(os.path.join(entry, file_name))
         elif os.path.isfile(entry):
-            videofiles.append(entry)
+            yaml_current = is_yaml_current(os.stat(entry).st_mtime_ns, get_mtime_ns(entry + '.yaml'))
+            if cli_args.force_overwrite or not(yaml_current):
+                videofiles.append(entry)
         else:
             print("Meh: " + str(entry) + " is not a file or folder")
 
-    if not(cli_args.force_overwrite):
-        videofiles = [ii for ii in videofiles if not(os.path.isfile(ii + '.yaml'))]
-
     print(str(len(videofiles)) + ' files will be processed ...')
 
-    call_args = [(f, x) for f, x in zip(videofiles, list(range(len(videofiles))))]
+    ordernums = list(range(len(videofiles)))
 
+    # threads are enough: hashing runs in GIL-free hashlib code and probing
+    # waits on ffprobe, so there is no need to fork and pickle for a process pool
     if not cli_args.skip_md5:
         if cli_args.concurrency == 1:
             # single-threaded for debugging
@@ -182,8 +207,8 @@ def main():
                 output_md5 = output_md5 + sum_file(file, it) + "\n"
             print(output_md5)
         else:
-            pool = Pool(cli_args.concurrency)
-            output_md5 = pool.starmap(sum_file, call_args)
+            with ThreadPoolExecutor(max_workers=cli_args.concurrency) as executor:
+                output_md5 = list(executor.map(sum_file, videofiles, ordernums))
             print()
             print("MD5 Results:")
             print("\n".join(output_md5))
@@ -199,8 +224,8 @@ def main():
                 output_src = analyse_src(v_file, it)
                 print(output_src)
         else:
-            pool = Pool(cli_args.concurrency)
-            output_src = pool.starmap(analyse_src, call_args)
+            with ThreadPoolExecutor(max_workers=cli_args.concurrency) as executor:
+                output_src = list(executor.map(analyse_src, videofiles, ordernums))
             print()
             print("INFO Results:")
             print("\n".join(output_src))
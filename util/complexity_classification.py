@@ -18,14 +18,15 @@
 import os
 import argparse
 import sys
-import math
+import numpy as np
 import pandas as pd
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
 import lib.log as log
-from lib.cmd_utils import ParallelRunner
+from lib.cmd_utils import run_command
 from lib.ffmpeg import get_segment_info
 
 logger = log.setup_custom_logger("main")
@@ -49,43 +50,34 @@ class Segment:
 
 def get_difficulty(output_file):
     info = get_segment_info(Segment(output_file))
-    size = info["file_size"]
-    duration = info["video_duration"]
-    framerate = info["video_frame_rate"]
-    nr_pixels = info["video_width"] * info["video_height"]
-
-    # get the normalized bitrate. nr_pixels / 1000 -> prevent norm_bitrate to get too close to zero
-    norm_bitrate = size / framerate / duration / (nr_pixels / 1000)
 
+    # norm_bitrate and complexity are computed for all files at once in main()
     return {
         "file": os.path.basename(output_file),
-        "norm_bitrate": norm_bitrate,
-        "complexity": 20 * math.log(norm_bitrate, 10) / REFERENCE_BITRATE,
-        "framerate": float(framerate),
+        "framerate": float(info["video_frame_rate"]),
         "width": int(info["video_width"]),
         "height": int(info["video_height"]),
-        "size": int(size),
-        "duration": float(duration),
+        "size": int(info["file_size"]),
+        "duration": float(info["video_duration"]),
     }
 
 
-def classify_complexity(complexity, framerate, quantiles):
-    if framerate <= 30:
-        curr_quants = quantiles["low"]
-    else:
-        curr_quants = quantiles["high"]
-
-    comp_class = 0
-    if complexity > curr_quants[0.50]:
-        if complexity > curr_quants[0.75]:
-            comp_class = 3
-        else:
-            comp_class = 2
-    else:
-        if complexity > curr_quants[0.25]:
-            comp_class = 1
+def classify_complexities(complexities, framerates, quantiles):
+    """
+    Return an array with the complexity class (0-3) of every file:
+    the number of quartiles of the respective frame rate group that the complexity exceeds
 
-    return comp_class
+    Arguments:
+        - complexities {numpy.ndarray} -- complexity per file
+        - framerates {numpy.ndarray} -- frame rate per file, same length as complexities
+        - quantiles {dict} -- "low" and "high" frame rate quartiles, each a sorted pandas Series
+    """
+    # quantiles are sorted, so searchsorted counts the ones strictly below each complexity
+    return np.where(
+        framerates <= 30,
+        np.searchsorted(quantiles["low"].values, complexities, side="left"),
+        np.searchsorted(quantiles["high"].values, complexities, side="left"),
+    )
 
 
 def parse_args():
@@ -105,7 +97,7 @@ def parse_args():
         help="Path to (temporary) complexity analysis folder",
     )
     parser.add_argument(
-        "-p", "--parallelism", default=1, help="Number of parallel encodes"
+        "-p", "--parallelism", type=int, default=1, help="Number of parallel encodes"
     )
     parser.add_argument(
         "-o",
@@ -141,6 +133,15 @@ def encode_file(input_file, output_file):
     return cmd
 
 
+def analyze_file(input_file, output_file, encode):
+    """
+    Encode file if requested and return its complexity data
+    """
+    if encode:
+        run_command(encode_file(input_file, output_file), name="encode " + str(input_file))
+    return get_difficulty(output_file)
+
+
 def main():
     cli_args = parse_args()
 
@@ -166,13 +167,9 @@ def main():
         else:
             logger.warn("Skipping file " + str(f) + " because it is not an .avi file")
 
-    all_data = []
-
-    parallel_runner = ParallelRunner(max_parallel=cli_args.parallelism)
-
     # handle all input files
     logger.info("Handling " + str(len(cli_args.input)) + " input files")
-    output_files = []
+    jobs = []
     for input_file in input_files:
 
         # encode file if necessary
@@ -184,38 +181,37 @@ def main():
                 + str(output_file)
                 + " already exists, use -f to force overwriting"
             )
+            jobs.append((input_file, output_file, False))
         else:
             logger.info(
                 "Will encode file " + str(input_file) + " to " + str(output_file)
             )
-            parallel_runner.add_cmd(encode_file(input_file, output_file))
-        output_files.append(output_file)
+            jobs.append((input_file, output_file, True))
+
+    # sort by output file name, so the results are already in CSV order
+    jobs.sort(key=lambda job: os.path.basename(job[1]))
 
     if cli_args.dry_run:
-        parallel_runner.log_commands()
+        for input_file, output_file, encode in jobs:
+            if encode:
+                logger.info(encode_file(input_file, output_file))
         sys.exit(0)
 
-    # run encodes
-    if parallel_runner.num_commands() > 0:
-        logger.info("Starting encoding, this may take a while ...")
-        parallel_runner.run_commands()
-        logger.info("All encodings completed, will analyze complexity")
-
-    # assemble output data
-
-    for output_file in output_files:
-        # get complexity data
-        data = get_difficulty(output_file)
-        all_data.append(data)
+    # each file is analyzed as soon as its own encode is done, instead of
+    # waiting for all encodes to complete
+    logger.info("Starting encoding and analysis, this may take a while ...")
+    with ThreadPoolExecutor(max_workers=cli_args.parallelism) as executor:
+        all_data = list(executor.map(lambda job: analyze_file(*job), jobs))
 
     # write data to output file
     if len(all_data) == 0:
         logger.error("No info calculated, exiting")
         sys.exit(1)
 
-    all_data = pd.DataFrame(all_data)
-    all_data = all_data[
-        [
+    # norm_bitrate and complexity start out empty and are filled in below
+    all_data = pd.DataFrame.from_records(
+        all_data,
+        columns=[
             "file",
             "norm_bitrate",
             "complexity",
@@ -224,21 +220,27 @@ def main():
             "height",
             "size",
             "duration",
-        ]
-    ].sort_values("file")
-
-    quant_lowfr = all_data[all_data["framerate"] <= 30]["complexity"].quantile(
-        [0.25, 0.5, 0.75]
+        ],
     )
-    quant_highfr = all_data[all_data["framerate"] > 30]["complexity"].quantile(
-        [0.25, 0.5, 0.75]
+
+    # get the normalized bitrate. nr_pixels / 1000 -> prevent norm_bitrate to get too close to zero
+    nr_pixels = all_data["width"] * all_data["height"]
+    all_data["norm_bitrate"] = all_data["size"] / all_data["framerate"] / all_data["duration"] / (nr_pixels / 1000)
+    all_data["complexity"] = 20 * np.log10(all_data["norm_bitrate"]) / REFERENCE_BITRATE
+
+    # quartiles of both frame rate groups in one pass; columns: is high frame rate
+    quant_by_fr = (
+        all_data.groupby(all_data["framerate"] > 30)["complexity"]
+        .quantile([0.25, 0.5, 0.75])
+        .unstack(level=0)
+        .reindex(columns=[False, True])
     )
     quants = {}
-    quants["low"] = quant_lowfr
-    quants["high"] = quant_highfr
+    quants["low"] = quant_by_fr[False]
+    quants["high"] = quant_by_fr[True]
 
-    all_data["complexity_class"] = all_data.apply(
-        lambda x: classify_complexity(x["complexity"], x["framerate"], quants), axis=1
+    all_data["complexity_class"] = classify_complexities(
+        all_data["complexity"].values, all_data["framerate"].values, quants
     )
 
     # write stats to CSV file
@@ -53,6 +53,7 @@ To use the script from within the virtual machine, install packages:
 import os
 import yaml
 import sys
+from bisect import bisect_left
 # import re
 import numpy as np
 import matplotlib
@@ -61,6 +62,12 @@ from matplotlib.patches import *
 from matplotlib.collections import PatchCollection
 from pylab import *
 
+# use the libyaml-based loader if PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 
 plot_param = {'audio_height': 0.1,
               'stall_height': 0.03,
@@ -115,10 +122,14 @@ def get_height_list():
     return [240, 360, 480, 540, 720, 1080, 1440, 2160]
 
 
+# sorted heights and their colors, looked up for every plotted segment
+HEIGHT_LIST = tuple(get_height_list())
+COLORS = tuple(get_colors())
+
+
 def get_color(height):
-    height_list = get_height_list()
-    i = [i for i, h in enumerate(height_list) if h >= height][0]
-    return get_colors()[i]
+    # color of the smallest listed height that is >= height
+    return COLORS[bisect_left(HEIGHT_LIST, height)]
 
 
 def plot_legend():
@@ -142,14 +153,13 @@ def is_int_multiple(x_mult, y):
     return is_mult
 
 
-def plot_stream(event_list, av_rep, ax, y_offset, video_duration, segment_dur, gop_dur, stream_label, av_type='video'):
+def plot_stream(event_list, av_rep, y_offset, video_duration, segment_dur, gop_dur, stream_label, av_type='video'):
     """
-    Create a plot of the HRCs
+    Create the patches for plotting an HRC stream, returned as a list of Rectangles
 
     INPUT:
     event_list     -- list of quality levels/stallling, e.g. [['buffering', 4], ['Q1080', 20], ['Q360', 5], ['Q1080', 15], ['Q360', 5], ['Q1080', 15]]
     av_rep         -- list of quality levels, e.g. [[1080, 2500, 'Q1080', 128], [720, 1400, 'Q720', 128], [480, 500, 'Q480', 96], [360, 400, 'Q360', 96], [240, 150, 'Q240', 64]]
-    ax             -- figure axes
     y_offset       -- float, y-axis offset
     video_duration -- float, default video duration
     segment_dur    -- segment duration in seconds, per quality level, e.g. {'Q720': 1, 'Q240': 5, 'Q1080': 5, 'Q480': 5, 'Q1080': 5, 'Q360': 5}
@@ -160,6 +170,7 @@ def plot_stream(event_list, av_rep, ax, y_offset, video_duration, segment_dur, g
     has_warning = False
     t = 0
     seg_dt = 0
+    patches = []
 
     # check constraints on chunk duration:
     if av_type == 'video':
@@ -188,9 +199,9 @@ def plot_stream(event_list, av_rep, ax, y_offset, video_duration, segment_dur, g
             if av_type == 'video':
                 stall_offset += plot_param['v_offset']
             if t == 0:
-                ax.add_patch(Rectangle((0, stall_offset), duration, plot_param['stall_height'], fc='grey'))
+                patches.append(Rectangle((0, stall_offset), duration, plot_param['stall_height'], fc='grey'))
             else:
-                ax.add_patch(Rectangle((t, stall_offset), duration, plot_param['stall_height'], fc='grey'))
+                patches.append(Rectangle((t, stall_offset), duration, plot_param['stall_height'], fc='grey'))
             t += duration
             seg_dt = duration
 
@@ -214,17 +225,20 @@ def plot_stream(event_list, av_rep, ax, y_offset, video_duration, segment_dur, g
                 # ax.text(t,y_offset+plot_param['v_offset'],"WARNING",rotation=30,rotation_mode='anchor',color='red')
                 has_warning = False
 
+            # same for all segments of this event
+            if av_type == 'video':
+                height = rep['height']*plot_param['v_height_max']/plot_param['v_res_max']
+                col = get_face_color(av_rep, rep)
+
             for i_seg in range(int(int(duration)/seg_dt)):
                 if av_type == 'video':
-                    height = rep['height']*plot_param['v_height_max']/plot_param['v_res_max']
                     # v_alpha = 1 # get_video_alpha(av_rep,rep[1])
-                    col = get_face_color(av_rep, rep)
                     # col = [1-v_alpha,1-v_alpha,1]
                     # if rep[0]==1440 or rep[0]==720 or rep[0]==360:
                     #     col = [1-v_alpha/2,1-v_alpha,1]
                     # plot each segment individually
-                    ax.add_patch(Rectangle((t, y_offset+plot_param['v_offset']), seg_dt, height,
-                                 fc=col, ec='grey'))
+                    patches.append(Rectangle((t, y_offset+plot_param['v_offset']), seg_dt, height,
+                                   fc=col, ec='grey'))
                     # add gop lines
                     # for j_gop in range(seg_dt/gop_dt):
                     #     ax.add_patch(Rectangle((t+j_gop*gop_dt,y_offset+plot_param['v_offset']),\
@@ -237,6 +251,8 @@ def plot_stream(event_list, av_rep, ax, y_offset, video_duration, segment_dur, g
                     #              fc=[1,1-.1*a_alpha,1-0.8*a_alpha],ec='grey'))
                 t += seg_dt
 
+    return patches
+
 
 def get_duration(event_list):
     return sum([e[1] for e in event_list])
@@ -245,7 +261,8 @@ def get_duration(event_list):
 def create_plot(config_file):
 
     # read and parse configuration
-    config = yaml.load(open(config_file))
+    with open(config_file) as f:
+        config = yaml.load(f, Loader=YamlLoader)
     av_rep = config['qualityLevelList']
     hrc_list = config['hrcList']
     video_duration = np.min([get_duration(h['eventList']) for h in hrc_list.values()])
@@ -258,6 +275,7 @@ def create_plot(config_file):
     ax = fig.add_subplot(111)
     label = []
     max_duration = 0
+    patches = []
     # plot HRCs
     for i, hrc_id in enumerate(sorted(hrc_list.keys())):
         hrc = hrc_list[hrc_id]
@@ -270,13 +288,17 @@ def create_plot(config_file):
 
         y_offset = len(hrc_list)-i-1
         # --- hrc to plot ---------------------------------------------------------
-        plot_stream(event_list, av_rep, ax, y_offset, video_duration, segment_dur, gop_dur, hrc_id, 'video')
-        plot_stream(event_list, av_rep, ax, y_offset, video_duration, segment_dur, gop_dur, hrc_id, 'audio')
+        patches.extend(plot_stream(event_list, av_rep, y_offset, video_duration, segment_dur, gop_dur, hrc_id, 'video'))
+        patches.extend(plot_stream(event_list, av_rep, y_offset, video_duration, segment_dur, gop_dur, hrc_id, 'audio'))
         # -------------------------------------------------------------------------
         label.append(hrc_id)
         label.append('video')
         label.append('audio')
 
+    # draw the patches of all HRCs at once, keeping their individual colors
+    if patches:
+        ax.add_collection(PatchCollection(patches, match_original=True))
+
     # add ticks and labels...
     label.reverse()
     r = arange(0., len(hrc_list))+plot_param['label_offset']
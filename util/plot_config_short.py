@@ -41,65 +41,117 @@ To use the script from within the virtual machine, install packages:
 > sudo apt-get update &&
 > sudo apt-get --assume-yes install python-dev
 > sudo pip install matplotlib
+
+matplotlib keeps its font cache in the '.mplcache' folder of the processing chain,
+so it is only built once, even when the home directory is reset (e.g. a fresh VM).
+Set MPLCONFIGDIR to use a different folder.
 """
 
 import os
 import sys
-import matplotlib
-
-matplotlib.use('svg')
-from matplotlib.patches import *
-from matplotlib.collections import PatchCollection
-from pylab import *
+import numpy as np
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 import lib.test_config as cfg
 import lib.log as log
 logger = log.setup_custom_logger('main')
 
+# matplotlib is slow to import, see import_matplotlib()
+plt = None
+PolyCollection = None
+
+
+def import_matplotlib():
+    """
+    Import matplotlib on first use, so that the usage message is shown without waiting for it
+    """
+    global plt, PolyCollection
+    if plt is not None:
+        return
+    # keep the font cache next to the processing chain, so it survives VM rebuilds
+    mpl_config_dir = os.environ.setdefault(
+        'MPLCONFIGDIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.mplcache'))
+    os.makedirs(mpl_config_dir, exist_ok=True)
+    import matplotlib
+    matplotlib.use('svg')
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PolyCollection
+
 
 # scale the x and y axis, such that the plane is used in a more uniform manner
 def scale_x(x):
-    return sqrt(x)
+    return np.sqrt(x)
 
 
 def scale_y(y):
-    return log(y)
+    return np.log(y)
 
 
-def plot_hrc(ax, height, bitrate):
-    """
-    Plot attributes of an HRC, currently:
+# axis ticks shared by all plots, in original and scaled units
+X_TICKS = np.array([120, 240, 360, 480, 720, 1080, 2160])
+Y_TICKS = np.logspace(2, 5, 4, dtype=int)
+X_TICKS_SCALED = scale_x(X_TICKS)
+Y_TICKS_SCALED = scale_y(Y_TICKS)
 
-    bitrate, frame height.
+
+def get_hrc_points(config):
+    """
+    Return (frame height, video bitrate, video codec) per HRC ID, in one pass over the HRCs.
+    The values are taken from the first quality level of each HRC; HRCs without
+    a quality level with a bitrate (e.g. YouTube) are skipped.
     """
-    ax.add_patch(Rectangle((scale_x(height), scale_y(bitrate)), scale_x(2), scale_y(1.2), color='red'))
+    points = {}
+    for hrc_id, hrc in config.hrcs.items():
+        quality_level = next(
+            (event.quality_level for event in hrc.event_list if event.event_type == "quality_level"), None)
+        if quality_level is None or not quality_level.video_bitrates:
+            continue
+        points[hrc_id] = (quality_level.height, quality_level.video_bitrates[0], quality_level.video_codec)
+    return points
 
 
 def create_plot(config):
     """
-    Plot the test design in a resolution-bitrate plot.
+    Plot the test design in a resolution-bitrate plot and return the figure.
     """
-    fig = figure(figsize=(10, 10))
-    ax = fig.add_subplot(111)
-
-    x_t = array([120, 240, 360, 480, 720, 1080, 2160])
-    y_t = array([10 ** i for i in range(2, 6)])
-    xticks(scale_x(x_t), x_t)
-    yticks(scale_y(y_t), y_t)
-    xlim([min(scale_x(x_t)), max(scale_x(x_t))])
-    ylim([min(scale_y(y_t)), max(scale_y(y_t))])
-
-    for hrc, event_list in config.data['hrcList'].items():
-        bitrate = config.get_bitrate(hrc)[0]
-        height = config.get_height(hrc)[0]
+    import_matplotlib()
 
-        plot_hrc(ax, height, bitrate)
+    fig = plt.figure(figsize=(10, 10))
+    ax = fig.add_subplot(111)
 
-    xlabel('frame height')
-    ylabel('bitrate in kbit/s')
+    ax.set_xticks(X_TICKS_SCALED)
+    ax.set_xticklabels(X_TICKS)
+    ax.set_yticks(Y_TICKS_SCALED)
+    ax.set_yticklabels(Y_TICKS)
+    ax.set_xlim([X_TICKS_SCALED.min(), X_TICKS_SCALED.max()])
+    ax.set_ylim([Y_TICKS_SCALED.min(), Y_TICKS_SCALED.max()])
+
+    # plot attributes of the HRCs, currently: bitrate, frame height.
+    # all rectangles go into one collection, built from a (N, 4, 2) array of corners
+    points = list(get_hrc_points(config).values())
+    heights = np.array([height for height, _, _ in points], dtype=float)
+    bitrates = np.array([bitrate for _, bitrate, _ in points], dtype=float)
+
+    # scale all positions at once, the rectangle size is the same for all HRCs
+    xs = scale_x(heights)
+    ys = scale_y(bitrates)
+    rect_width = scale_x(2)
+    rect_height = scale_y(1.2)
+    verts = np.stack([
+        np.stack([xs, ys], axis=1),
+        np.stack([xs + rect_width, ys], axis=1),
+        np.stack([xs + rect_width, ys + rect_height], axis=1),
+        np.stack([xs, ys + rect_height], axis=1),
+    ], axis=1)
+
+    ax.add_collection(PolyCollection(verts, facecolor='red', edgecolor='red'))
+
+    ax.set_xlabel('frame height')
+    ax.set_ylabel('bitrate in kbit/s')
     fig.suptitle('AVHD-AS/P.NATS phase2 framework')
 
+    return fig
+
 
 def create_plot_codecwise(config, yamlPath):
     """
@@ -110,49 +162,50 @@ def create_plot_codecwise(config, yamlPath):
     Supported videocodecs are: vp9, h264, h265
 
     """
-    bitrates = [[], [], []]
-    heights = [[], [], []]
+    import_matplotlib()
+
     videoCodecs = ['vp9', 'h264', 'h265']
+    # (heights, bitrates) per supported codec
+    buckets = {codec: ([], []) for codec in videoCodecs}
 
     (dir, tail) = os.path.split(yamlPath)
     databaseName = os.path.splitext(tail)[0]
     savepath = os.path.join(dir, databaseName + '_datarate-resolution_plot_')
 
-    for hrc, event_list in config.data['hrcList'].items():
-        q_level = [e[0] for e in config.data['hrcList'][hrc]['eventList']]
-        videoCodec = [config.data['qualityLevelList'][q]['videoCodec'] for q in q_level]
-        videoCodec = videoCodec[0]
-
-        if videoCodec not in videoCodecs:
+    # the codec of the first quality level is used for the whole HRC
+    for height, bitrate, videoCodec in get_hrc_points(config).values():
+        if videoCodec not in buckets:
             print("Unexpected video codec %s ! Ignoring it..." % videoCodec)
 
         else:
-            position = videoCodecs.index(videoCodec)
+            heights, bitrates = buckets[videoCodec]
+            heights.append(height)
+            bitrates.append(bitrate)
 
-            bitrates[position].append(config.get_bitrate(hrc)[0])
-            heights[position].append(config.get_height(hrc)[0])
+    # one figure for all codecs, the axes are cleared before each plot
+    fig, ax = plt.subplots(figsize=(10, 10))
+    fig.suptitle('AVHD-AS/P.NATS phase2 framework')
 
-    for counter in range(len(videoCodecs)):
-        fig = figure(figsize=(10, 10))
-        ax = fig.add_subplot(111)
+    for videoCodec, (heights, bitrates) in buckets.items():
+        ax.clear()
 
-        x_t = array([120, 240, 360, 480, 720, 1080, 2160])
-        xticks(x_t)
+        ax.set_xticks(X_TICKS)
 
-        ax.scatter(heights[counter], bitrates[counter])  # new
+        ax.scatter(heights, bitrates)  # new
 
-        xlabel('frame height')
-        ylabel('bitrate in kbit/s')
+        ax.set_xlabel('frame height')
+        ax.set_ylabel('bitrate in kbit/s')
 
         ax.grid(True)
-        ax.set_title(videoCodecs[counter])
-        fig.suptitle('AVHD-AS/P.NATS phase2 framework')
+        ax.set_title(videoCodec)
 
-        plot_file = savepath + videoCodecs[counter] + '.svg'
+        plot_file = savepath + videoCodec + '.svg'
 
-        savefig(plot_file)
+        fig.savefig(plot_file)
         print("Created plot and saved it in %s." % plot_file)
 
+    plt.close(fig)
+
 
 def info_str(plot_fn):
     return ('Create a plot of video test conditions and \nstore it in %s' % plot_fn)
@@ -195,10 +248,11 @@ if __name__ == "__main__":
     else:
         config = cfg.TestConfig(sys.argv[1])
 
-        create_plot(config)
+        fig = create_plot(config)
 
         plot_file = sys.argv[1][:-5] + '.svg'
 
-        savefig(plot_file)
+        fig.savefig(plot_file)
+        plt.close(fig)
 
         print('Created plot and stored it in %s' % plot_file)